@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+""" Anagram index for the 6.00 Word Game
+
+Maps a sorted-letter signature (e.g. 'aet') to the list of words spelled
+with exactly those letters (e.g. ['ate', 'eat', 'tea']). To find every word
+that can be made from a hand, we enumerate the sub-multisets of the hand
+(at most 2^8 of them for an 8 letter hand) and look each one up, so the
+cost depends on the size of the hand instead of the size of the word list.
+"""
+
+from itertools import product
+
+# Points getWordScore adds for a word that uses all the letters of a hand
+# of n letters; every module that scores moves uses this one
+BONUS = 50
+
+
+def rankKey(candidate):
+    """
+    Returns the sort key of a (score, word) candidate: best score first,
+    ties in alphabetical order. Every ranking of candidate words uses it.
+
+    candidate: tuple (int, string)
+    returns: tuple (int, string)
+    """
+    return -candidate[0], candidate[1]
+
+
+def signature(word):
+    """
+    Returns the sorted-letter signature of word.
+
+    For example:
+    >>> signature('tea')
+    'aet'
+
+    word: string
+    returns: string
+    """
+    return ''.join(sorted(word))
+
+
+def handSignature(hand):
+    """
+    Returns the signature of the letters in the hand. Two hands holding
+    the same letters always have the same signature, so it can be used as
+    a canonical, hashable key for the hand.
+
+    hand: dictionary (string -> int)
+    returns: string
+    """
+    return ''.join(sorted(ltr * cnt for ltr, cnt in hand.items() if cnt > 0))
+
+
+def buildAnagramIndex(wordList):
+    """
+    Returns a dictionary mapping each signature to the words in wordList
+    that have that signature.
+
+    wordList: iterable of lowercase strings (a dict of words works as well)
+    returns: dictionary (string -> list of strings)
+    """
+    index = {}
+    for word in wordList:
+        sig = signature(word)
+        if sig in index:
+            index[sig].append(word)
+        else:
+            index[sig] = [word]
+    return index
+
+
+def subSignatures(hand):
+    """
+    Yields the signature of every non-empty sub-multiset of the hand.
+
+    Letters are taken in sorted order, so every generated string is already
+    a valid signature and can be looked up directly in the anagram index.
+
+    hand: dictionary (string -> int)
+    """
+    letters = sorted(ltr for ltr in hand if hand[ltr] > 0)
+    ranges = [range(hand[ltr] + 1) for ltr in letters]
+    for counts in product(*ranges):
+        sig = ''.join(ltr * c for ltr, c in zip(letters, counts))
+        if sig:
+            yield sig
+
+
+def findWords(hand, index):
+    """
+    Yields every word in the anagram index that can be made from the
+    letters in the hand.
+
+    hand: dictionary (string -> int)
+    index: dictionary (string -> list of strings), see buildAnagramIndex
+    """
+    for sig in subSignatures(hand):
+        words = index.get(sig)
+        if words:
+            yield from words
+
+
+def splitSignatures(hand):
+    """
+    Yields (sub, rest) for every non-empty sub-multiset of the hand, where
+    sub is the signature of the sub-multiset and rest is the signature of
+    the letters left in the hand once sub is taken out.
+
+    hand: dictionary (string -> int)
+    """
+    letters = sorted(ltr for ltr in hand if hand[ltr] > 0)
+    ranges = [range(hand[ltr] + 1) for ltr in letters]
+    for counts in product(*ranges):
+        sub = ''.join(ltr * c for ltr, c in zip(letters, counts))
+        if sub:
+            yield sub, ''.join(ltr * (hand[ltr] - c) for ltr, c in zip(letters, counts))
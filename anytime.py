@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+""" Anytime computer player for the 6.00 Word Game
+
+chooseWord finds the best word for a hand within a deadline. Instead of
+checking every candidate and then ranking them, it visits the
+sub-multisets of the hand best first and stops as soon as the best word
+is proven.
+
+The score of a word only depends on its letters, so every sub-multiset
+S of the hand has a known score (sum of its letter values times its
+length, plus the bonus when it uses n letters). The score can only grow
+as letters are added, so
+
+    bound(S) = value(S) * len(S) + (BONUS if len(S) >= n else 0)
+
+bounds the score of S and of every sub-multiset of S. The sub-multisets
+are taken from a heap ordered by that bound, starting with the whole hand
+and removing one letter at a time, and looked up in the anagram index.
+Once the best word found scores at least the bound at the top of the
+heap, no other word can beat it: the result is proven optimal. If the
+deadline comes first, the best word found so far is returned, unproven;
+a search that has not found any word yet goes on until it finds one (at
+most every sub-multiset of the hand is looked up), so the player never
+gives up on a hand that can still make a word.
+
+With lookahead, the time left is spent looking for the best sequence of
+words for the whole hand, first words with the highest bound on their
+total tried first:
+
+    total(S) <= score(S) + value(R) * len(R) + BONUS
+
+where R is what is left of the hand once S is played.
+"""
+
+from collections import namedtuple
+import heapq
+import time
+
+from anagram import BONUS, handSignature, splitSignatures
+
+Choice = namedtuple('Choice', ['word', 'score', 'total', 'proven', 'examined'])
+Choice.__doc__ = """ Result of chooseWord
+
+word: string, the best word found, or None if the hand cannot make any
+word (which is then proven)
+score: int, the score of word (getWordScore)
+total: int, with lookahead the total score of the best sequence of words
+starting with word, otherwise score
+proven: bool, True if no other word (or, with lookahead, sequence) can
+score more
+examined: int, number of sub-multisets of the hand looked up
+"""
+
+
+class _Deadline(Exception):
+    """ Raised inside the search when the deadline has passed """
+
+
+def letterValue(sig, values):
+    return sum(values.get(ltr, 0) for ltr in sig)
+
+
+def chooseWord(hand, index, values, n, deadline=None, lookahead=False):
+    """
+    Returns the Choice of the best word for the hand found before the
+    deadline.
+
+    hand: dictionary (string -> int)
+    index: dictionary (string -> list of strings), the anagram index
+    values: dictionary (string -> int), the letter values
+    n: int, hand size for the bonus (getWordScore's n)
+    deadline: float, time.perf_counter() time to return by once a word has
+    been found (None: no limit)
+    lookahead: bool, use the time left to find the best whole-hand
+    sequence and choose its first word
+    returns: Choice
+    """
+    letters = sorted(ltr for ltr in hand if hand[ltr] > 0)
+    counts = tuple(hand[ltr] for ltr in letters)
+    size = sum(counts)
+    letterValues = [ values.get(ltr, 0) for ltr in letters ]
+
+    def bound(value, length):
+        return value * length + (BONUS if length >= n else 0)
+
+    # Heap of (-bound, counts, value, length); counts are the letter counts
+    # of the sub-multiset, in the order of letters
+    value = sum(v * c for v, c in zip(letterValues, counts))
+    heap = [(-bound(value, size), counts, value, size)]
+    seen = {counts}
+    best = None
+    bestScore = -1
+    examined = 0
+    proven = True
+    while heap:
+        if best is not None and bestScore >= -heap[0][0]:
+            break
+        if best is not None and deadline is not None and time.perf_counter() > deadline:
+            proven = False
+            break
+        negBound, sub, value, length = heapq.heappop(heap)
+        if length == 0:
+            continue
+        examined += 1
+        words = index.get(''.join(ltr * c for ltr, c in zip(letters, sub)))
+        if words:
+            score = value * length + (BONUS if length == n else 0)
+            if score > bestScore:
+                best, bestScore = min(words), score
+        for i, c in enumerate(sub):
+            if c:
+                child = sub[:i] + (c - 1,) + sub[i + 1:]
+                if child not in seen:
+                    seen.add(child)
+                    childValue = value - letterValues[i]
+                    heapq.heappush(heap, (-bound(childValue, length - 1), child, childValue, length - 1))
+
+    if best is None:
+        return Choice(None, 0, 0, proven, examined)
+    choice = Choice(best, bestScore, bestScore, proven, examined)
+    if lookahead and proven:
+        choice = _lookahead(hand, index, values, deadline, choice)
+    return choice
+
+
+def _lookahead(hand, index, values, deadline, single):
+    """
+    Looks for the best sequence of words for the whole hand before the
+    deadline, as solver.solveHand does; returns single (the best single
+    word) if no better first word is proven in time.
+    """
+    # memo: signature of remaining letters -> best total score from there
+    memo = {}
+
+    def best(sig):
+        if sig in memo:
+            return memo[sig]
+        if deadline is not None and time.perf_counter() > deadline:
+            raise _Deadline()
+        counts = {}
+        for ltr in sig:
+            counts[ltr] = counts.get(ltr, 0) + 1
+        top = 0
+        for sub, rest in splitSignatures(counts):
+            if index.get(sub):
+                score = letterValue(sub, values) * len(sub) + (BONUS if len(sub) == len(sig) else 0)
+                top = max(top, score + best(rest))
+        memo[sig] = top
+        return top
+
+    start = handSignature(hand)
+    counts = {}
+    for ltr in start:
+        counts[ltr] = counts.get(ltr, 0) + 1
+    moves = []
+    for sub, rest in splitSignatures(counts):
+        words = index.get(sub)
+        if words:
+            score = letterValue(sub, values) * len(sub) + (BONUS if len(sub) == len(start) else 0)
+            upper = score + (letterValue(rest, values) * len(rest) + BONUS if rest else 0)
+            moves.append((upper, score, min(words), rest))
+    moves.sort(key=lambda m: (-m[0], m[2]))
+
+    choice = single
+    examined = single.examined + len(moves)
+    try:
+        for upper, score, word, rest in moves:
+            if choice.total >= upper:
+                break
+            total = score + best(rest)
+            if total > choice.total:
+                choice = Choice(word, score, total, True, examined)
+    except _Deadline:
+        return choice._replace(proven=False, examined=examined + len(memo))
+    return choice._replace(proven=True, examined=examined + len(memo))
@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+""" Bulk offline evaluation of hands for the 6.00 Word Game
+
+Reads hands as JSON lines (from a file or stdin) and writes one JSON line
+per hand, in input order, with the best word for the hand, its score, the
+ranked list of every word that can be made from it and, with --solve, the
+best sequence of words for the whole hand (see compSolveHand).
+
+Input lines are either a JSON object or a bare JSON string:
+
+    {"id": "puzzle-1", "hand": "aelpp"}
+    {"hand": {"a": 1, "e": 1, "l": 1, "p": 2}, "n": 7}
+    "quizes"
+
+"n" is the hand size used for the bonus of getWordScore (default: the
+number of letters in the hand); "id" is copied to the output.
+
+Output lines:
+
+    {"line": 0, "id": "puzzle-1", "hand": "aelpp", "n": 5, "best": "apple",
+     "score": 95, "candidates": [[95, "apple"], [28, "leap"], ...],
+     "solution": {"score": 95, "words": ["apple"]}}
+
+A hand that cannot be evaluated (including one of more than MAX_HAND_SIZE
+letters) gets {"line": ..., "error": "..."}.
+
+Hands are evaluated in chunks by a pool of worker processes. At most a
+few chunks per worker are read ahead of the output, so a large input is
+never read into memory at once. After every chunk the output is flushed
+and a checkpoint (OUTPUT.ckpt) records how many input lines are done;
+running again with --resume skips them and appends to the output.
+
+Example:
+    python batch.py hands.jsonl --output best.jsonl --workers 4 --solve
+    python batch.py hands.jsonl --output best.jsonl --resume
+"""
+
+import argparse
+from collections import deque
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+import wordgame
+from hand import Hand
+
+CHUNK_SIZE = 200
+CHECKPOINT_SUFFIX = '.ckpt'
+
+
+def parseHand(record):
+    """
+    Returns (Hand, n, id) for one decoded input line.
+
+    raises ValueError if the line does not describe a hand
+    """
+    if isinstance(record, str):
+        record = {'hand': record}
+    if not isinstance(record, dict) or 'hand' not in record:
+        raise ValueError("expected a hand string or an object with a 'hand'")
+    letters = record['hand']
+    if isinstance(letters, dict):
+        hand = Hand.fromDict(letters)
+    elif isinstance(letters, str):
+        hand = Hand(letters.lower())
+    else:
+        raise ValueError("'hand' must be a string or an object of letter counts")
+    if hand.total > wordgame.MAX_HAND_SIZE:
+        # The word list only holds words of at most MAX_HAND_SIZE letters,
+        # and the sub-multisets of a longer hand are too many to look up
+        raise ValueError("hands have at most " + str(wordgame.MAX_HAND_SIZE) + " letters")
+    n = record.get('n', hand.total)
+    if not isinstance(n, int):
+        raise ValueError("'n' must be an integer")
+    return hand, n, record.get('id')
+
+
+def evaluateHand(hand, n, solve=False):
+    """
+    Evaluates one hand with the loaded word list.
+
+    hand: Hand or dictionary (string -> int)
+    n: int, hand size for the bonus of getWordScore
+    solve: bool, also find the best sequence of words for the whole hand
+    returns: dict with 'best', 'score', 'candidates' and, if solve,
+    'solution' ({'score', 'words'})
+    """
+    wordList = wordgame.wordList
+    ranked = wordgame.compCandidates(hand, wordList, n)
+    result = {
+        'best': ranked[0][1] if ranked else None,
+        'score': ranked[0][0] if ranked else 0,
+        'candidates': [ list(sw) for sw in ranked ],
+    }
+    if solve:
+        solution = wordgame.compSolveHand(hand, wordList)
+        result['solution'] = {'score': solution.score, 'words': list(solution.words)}
+    return result
+
+
+def evaluateChunk(spec):
+    """
+    Evaluates a chunk of input lines.
+
+    spec: tuple (list of (line number, text), solve)
+    returns: list of output lines (strings, without newline)
+    """
+    lines, solve = spec
+    out = []
+    for number, text in lines:
+        result = {'line': number}
+        try:
+            hand, n, ident = parseHand(json.loads(text))
+            if ident is not None:
+                result['id'] = ident
+            result['hand'] = hand.key()
+            result['n'] = n
+            result.update(evaluateHand(hand, n, solve))
+        except (ValueError, TypeError) as e:
+            result['error'] = str(e)
+        out.append(json.dumps(result))
+    return out
+
+
+def readChunks(inFile, chunkSize=CHUNK_SIZE, skip=0):
+    """
+    Yields the non-blank lines of inFile as lists of (line number, text)
+    of at most chunkSize lines, after skipping the first skip lines.
+    """
+    chunk = []
+    for number, text in itertools.islice(enumerate(inFile), skip, None):
+        if text.strip():
+            chunk.append((number, text))
+        if len(chunk) >= chunkSize:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def evaluate(chunks, workers=None, solve=False, readAhead=2):
+    """
+    Evaluates chunks of input lines (see readChunks) and yields, for every
+    chunk in input order, the tuple (last line number, output lines).
+
+    workers: int, number of worker processes (default: one per CPU); 0
+    evaluates in this process
+    readAhead: int, chunks in flight per worker; the input is not read
+    further ahead than that (backpressure)
+    """
+    if workers == 0:
+        wordgame.loadWorkerWords()
+        for chunk in chunks:
+            yield chunk[-1][0], evaluateChunk((chunk, solve))
+        return
+
+    with multiprocessing.Pool(workers, initializer=wordgame.loadWorkerWords) as pool:
+        limit = readAhead * (workers or os.cpu_count() or 1)
+        pending = deque()
+        for chunk in chunks:
+            pending.append((chunk[-1][0], pool.apply_async(evaluateChunk, ((chunk, solve),))))
+            while len(pending) >= limit:
+                last, result = pending.popleft()
+                yield last, result.get()
+        while pending:
+            last, result = pending.popleft()
+            yield last, result.get()
+
+
+def readCheckpoint(path):
+    """ Returns the checkpoint at path as a dict ({'lines', 'bytes'}), or None """
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def writeCheckpoint(path, lines, size):
+    with open(path + '.tmp', 'w') as f:
+        json.dump({'lines': lines, 'bytes': size}, f)
+    os.replace(path + '.tmp', path)
+
+
+def run(inFile, output, workers=None, solve=False, chunkSize=CHUNK_SIZE, resume=False, log=None):
+    """
+    Evaluates the hands of inFile and writes the results to the file
+    output, checkpointing after every chunk.
+
+    inFile: text file of JSON lines
+    output: string, path of the output file
+    resume: bool, continue after the lines recorded in the checkpoint
+    log: text file for the throughput log (default: stderr)
+    returns: int, number of hands evaluated in this run
+    """
+    if log is None:
+        log = sys.stderr
+    checkpoint = output + CHECKPOINT_SUFFIX
+    skip = 0
+    mode = 'w'
+    state = readCheckpoint(checkpoint) if resume else None
+    if state is not None:
+        # Drop anything written after the last checkpoint
+        skip = state['lines']
+        mode = 'r+'
+        print("Resuming after", skip, "input lines", file=log)
+
+    hands = 0
+    start = time.perf_counter()
+    with open(output, mode) as out:
+        if state is not None:
+            out.truncate(state['bytes'])
+            out.seek(state['bytes'])
+        for last, lines in evaluate(readChunks(inFile, chunkSize, skip), workers, solve):
+            for line in lines:
+                out.write(line + '\n')
+            out.flush()
+            writeCheckpoint(checkpoint, last + 1, out.tell())
+            hands += len(lines)
+            elapsed = time.perf_counter() - start
+            print("   {:,} hands ({:,.0f} hands/s)".format(hands, hands / elapsed if elapsed else 0.0),
+                  file=log)
+    elapsed = time.perf_counter() - start
+    print("Evaluated {:,} hands in {:.2f}s ({:,.0f} hands/s)".format(
+        hands, elapsed, hands / elapsed if elapsed else 0.0), file=log)
+    return hands
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk evaluation of hands for the 6.00 Word Game")
+    parser.add_argument('input', nargs='?', default='-', help="JSON lines of hands (default: stdin)")
+    parser.add_argument('--output', required=True, help="where to write the JSON lines of results")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="worker processes (default: one per CPU, 0: no pool)")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help="hands per chunk")
+    parser.add_argument('--solve', action='store_true',
+                        help="also find the best sequence of words for the whole hand")
+    parser.add_argument('--resume', action='store_true',
+                        help="continue from the checkpoint of a previous run")
+    args = parser.parse_args(argv)
+
+    if args.input == '-':
+        run(sys.stdin, args.output, args.workers, args.solve, args.chunk_size, args.resume)
+    else:
+        with open(args.input) as inFile:
+            run(inFile, args.output, args.workers, args.solve, args.chunk_size, args.resume)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+""" Benchmarks for the hot paths of the 6.00 Word Game
+
+Times loadWords, the time to the first deal (scoring every word at load
+time or lazily, see lazyscore.py), dealHand, isValidWord, updateHand,
+getWordScore, compChooseWord, compPlayHand, full word list scans (over the
+dict, over a ColumnarLexicon and on the process pool of the 'pool' engine)
+and hints (median and 99th percentile latency) against word lists of
+several sizes: the bundled words.txt and synthetic lists of 500k and 2M
+words (generated once into bench_data/ from a fixed seed). Hands and words
+are drawn from fixed seeds too, so two runs on the same machine time the
+same work.
+
+Results are written as JSON and compared with a stored baseline. A hot
+path that got slower than the baseline by more than the threshold is
+reported as a regression and makes the run exit with status 1. The
+baseline is machine specific, so it is not part of the repository: record
+one with --save-baseline before making a change.
+
+Example:
+    python bench.py --sizes bundled,500k --save-baseline
+    python bench.py --sizes bundled,500k --threshold 0.15
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import sys
+import time
+
+import wordgame
+from columnar import ColumnarLexicon
+import hints
+
+DATA_DIR = 'bench_data'
+OUTPUT_FILENAME = 'bench_output.json'
+BASELINE_FILENAME = 'bench_baseline.json'
+
+FIXTURES = {
+    'bundled': None,
+    '500k': 500000,
+    '2m': 2000000,
+}
+
+SEED = 600
+HAND_SIZE = 7
+MAX_WORD_LEN = 8
+
+
+def syntheticWordList(count, seed=SEED):
+    """
+    Returns the path of a synthetic word list of count unique words,
+    generating it on first use. Letters follow the letter frequencies of the
+    bundled word list and word lengths range from 2 to 12.
+    """
+    path = os.path.join(DATA_DIR, 'synthetic_%d.txt' % count)
+    if os.path.exists(path):
+        return path
+    os.makedirs(DATA_DIR, exist_ok=True)
+
+    with open(wordgame.WORDLIST_FILENAME) as f:
+        text = f.read().lower()
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    weights = [text.count(ltr) for ltr in letters]
+
+    rng = random.Random(seed)
+    words = set()
+    while len(words) < count:
+        for length in rng.choices(range(2, 13), k=count - len(words)):
+            words.add(''.join(rng.choices(letters, weights, k=length)))
+    with open(path + '.tmp', 'w') as f:
+        for word in sorted(words):
+            f.write(word.upper() + '\n')
+    os.replace(path + '.tmp', path)
+    return path
+
+
+def fixturePath(name):
+    """ Returns the word list file of the named fixture """
+    count = FIXTURES[name]
+    if count is None:
+        return wordgame.WORDLIST_FILENAME
+    return syntheticWordList(count)
+
+
+def timeCalls(func, args, rounds=5):
+    """
+    Calls func(*a) for every a in args, rounds times, and returns the
+    median time per call in seconds.
+    """
+    times = []
+    for r in range(rounds):
+        start = time.perf_counter()
+        for a in args:
+            func(*a)
+        times.append((time.perf_counter() - start) / max(len(args), 1))
+    times.sort()
+    return times[len(times) // 2]
+
+
+def latencies(func, args):
+    """
+    Calls func(*a) once for every a in args and returns the median and the
+    99th percentile time per call in seconds.
+    """
+    times = []
+    for a in args:
+        start = time.perf_counter()
+        func(*a)
+        times.append(time.perf_counter() - start)
+    times.sort()
+    return times[len(times) // 2], times[min(len(times) - 1, len(times) * 99 // 100)]
+
+
+def quietly(func, *args, **kwargs):
+    """ Calls func with its printed output discarded """
+    with contextlib.redirect_stdout(io.StringIO()):
+        return func(*args, **kwargs)
+
+
+def benchFixture(name, calls=200):
+    """
+    Runs every benchmark on the named fixture.
+
+    returns: dict (benchmark name -> seconds per call)
+    """
+    results = {}
+    source = wordgame.WORDLIST_FILENAME
+    wordgame.WORDLIST_FILENAME = fixturePath(name)
+    try:
+        start = time.perf_counter()
+        quietly(wordgame.loadWords, MAX_WORD_LEN, useCache=False)
+        results['loadWords'] = time.perf_counter() - start
+        # From a cold start (no snapshot) to the first hand dealt
+        for label, lazy in (('first deal (eager)', False), ('first deal (lazy)', True)):
+            start = time.perf_counter()
+            wordgame.dealHand(quietly(wordgame.loadWords, MAX_WORD_LEN, useCache=False, lazy=lazy), HAND_SIZE)
+            results[label] = time.perf_counter() - start
+        quietly(wordgame.loadWords, MAX_WORD_LEN, rebuildCache=True)
+        start = time.perf_counter()
+        wordList = quietly(wordgame.loadWords, MAX_WORD_LEN)
+        results['loadWords (snapshot)'] = time.perf_counter() - start
+    finally:
+        wordgame.WORDLIST_FILENAME = source
+
+    rng = random.Random(SEED)
+    hands = wordgame.dealHands(calls, HAND_SIZE, wordList, rng)
+    words = [ rng.choice(wordgame.compCandidates(hand, wordList, HAND_SIZE))[1] for hand in hands ]
+    handWords = list(zip(hands, words))
+
+    # Move generation is timed without the candidate cache
+    capacity = wordgame.candidateCache.capacity
+    wordgame.candidateCache.capacity = 0
+    try:
+        results['dealHand'] = timeCalls(lambda: wordgame.dealHand(wordList, HAND_SIZE, rng), [()] * calls)
+        results['isValidWord'] = timeCalls(lambda h, w: wordgame.isValidWord(w, h, wordList), handWords)
+        results['updateHand'] = timeCalls(lambda h, w: wordgame.updateHand(h, w), handWords)
+        results['getWordScore'] = timeCalls(lambda h, w: wordgame.getWordScore(w, HAND_SIZE), handWords)
+        results['compChooseWord'] = timeCalls(
+            lambda h: wordgame.compChooseWord(h, wordList, HAND_SIZE, rng=rng), [ (h,) for h in hands ])
+        results['compPlayHand'] = timeCalls(
+            lambda h: quietly(wordgame.compPlayHand, h, wordList, HAND_SIZE, 'greedy'),
+            [ (h,) for h in hands ], rounds=3)
+        # Full scans are slow: time them on a few hands only
+        scanHands = [ (h,) for h in hands[:10] ]
+        columnar = ColumnarLexicon.fromWordList(wordList)
+        results['scan (dict)'] = timeCalls(
+            lambda h: wordgame.compCandidates(h, wordList, HAND_SIZE, 'scan'), scanHands, rounds=1)
+        results['scan (columnar)'] = timeCalls(
+            lambda h: wordgame.compCandidates(h, columnar, HAND_SIZE, 'scan'), scanHands, rounds=3)
+        wordgame.getScanPool(wordList)
+        results['scan (pool)'] = timeCalls(
+            lambda h: wordgame.compCandidates(h, wordList, HAND_SIZE, 'pool'), scanHands, rounds=3)
+        wordgame.closeScanPool()
+        # Hints for no prefix and for the first one and two letters of a word
+        dawg = wordgame.getDawg(wordList)
+        queries = [ (h, w[:i]) for h, w in handWords for i in range(3) ]
+        results['hint p50'], results['hint p99'] = latencies(
+            lambda h, p: hints.completions(dawg, h, p, wordgame.HINT_COUNT, wordgame.HINT_BUDGET), queries)
+    finally:
+        wordgame.candidateCache.capacity = capacity
+    return results
+
+
+def compare(current, baseline, threshold):
+    """
+    Compares two result sets and returns a list of (fixture, benchmark,
+    baseline seconds, current seconds, relative change) for every
+    benchmark that got slower by more than threshold.
+    """
+    regressions = []
+    for fixture, results in current.items():
+        for bench, seconds in results.items():
+            base = baseline.get(fixture, {}).get(bench)
+            if not base:
+                continue
+            change = seconds / base - 1.0
+            if change > threshold:
+                regressions.append((fixture, bench, base, seconds, change))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks for the 6.00 Word Game")
+    parser.add_argument('--sizes', default=','.join(FIXTURES),
+                        help="comma separated fixtures to run (default: %(default)s)")
+    parser.add_argument('--calls', type=int, default=200, help="calls per timed round")
+    parser.add_argument('--output', default=OUTPUT_FILENAME, help="where to write the results")
+    parser.add_argument('--baseline', default=BASELINE_FILENAME, help="baseline to compare against")
+    parser.add_argument('--save-baseline', action='store_true', help="store the results as the new baseline")
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help="relative slowdown counted as a regression (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    current = {}
+    for name in args.sizes.split(','):
+        if name not in FIXTURES:
+            parser.error("unknown fixture " + repr(name))
+        print("Benchmarking", name, "...")
+        current[name] = benchFixture(name, args.calls)
+        for bench, seconds in current[name].items():
+            print("   {:<22} {:>12.3f} us".format(bench, seconds * 1e6))
+
+    output = {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'date': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'results': current,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(output, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(output, f, indent=2)
+        print("Baseline saved to", args.baseline)
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("No baseline at", args.baseline, "- run with --save-baseline to record one")
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)['results']
+    regressions = compare(current, baseline, args.threshold)
+    for fixture, bench, base, seconds, change in regressions:
+        print("REGRESSION {}/{}: {:.3f} us -> {:.3f} us (+{:.0%})".format(
+            fixture, bench, base * 1e6, seconds * 1e6, change))
+    if regressions:
+        return 1
+    print("No regressions beyond {:.0%} of the baseline".format(args.threshold))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
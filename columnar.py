@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+""" Columnar word list for the 6.00 Word Game
+
+ColumnarLexicon stores the word list in a few contiguous arrays instead of
+a dict of two-element lists:
+
+    words       bytes           every word, back to back
+    offsets     uint32[N + 1]   word i is words[offsets[i]:offsets[i + 1]]
+    scores      uint16[N]       getWordScore_init(word i)
+    lengths     uint8[N]        len(word i)
+    masks       uint32[N]       bit j set if word i holds letter 'a' + j
+    lengthStart uint32          words of length n are [lengthStart[n], lengthStart[n + 1])
+    table       uint32          hash table of the words, see lexcache.hashTable
+
+Words are sorted by (length, word). Scans run over the arrays: playable()
+first drops every word holding a letter the hand does not have by testing
+its 26-bit mask, and only counts the letters of the few words left.
+
+ColumnarLexicon is a read-only Mapping (word -> (score, len)), so it can
+be used as a wordList: word in lexicon and lexicon[word] look the word up
+in the hash table, as isValidWord and getWordScore do.
+"""
+
+from array import array
+from collections.abc import Mapping, ItemsView
+import zlib
+
+from lexcache import hashTable, snapshotBuckets, tableSize
+
+_ORD_A = ord('a')
+
+
+def letterMask(letters):
+    """ Returns the 26-bit mask of the lowercase letters in letters """
+    mask = 0
+    for ltr in letters:
+        j = ord(ltr) - _ORD_A
+        if 0 <= j < 26:
+            mask |= 1 << j
+    return mask
+
+
+class ColumnarLexicon(Mapping):
+    """ Read-only wordList (word -> (score, len)) held in arrays """
+
+    def __init__(self, words, scores):
+        """
+        words: list of lowercase strings
+        scores: list of int, scores[i] is the score of words[i]
+        """
+        order = sorted(range(len(words)), key=lambda i: (len(words[i]), words[i]))
+        sortedWords = [ words[i] for i in order ]
+        self.maxLen = max((len(w) for w in sortedWords), default=0)
+
+        self.words = ''.join(sortedWords).encode('ascii')
+        self.offsets = array('I', [0])
+        self.lengths = array('B')
+        self.masks = array('I')
+        self.lengthStart = array('I', [0]) * (self.maxLen + 2)
+        for word in sortedWords:
+            self.offsets.append(self.offsets[-1] + len(word))
+            self.lengths.append(len(word))
+            self.masks.append(letterMask(word))
+            self.lengthStart[len(word) + 1] += 1
+        for n in range(1, self.maxLen + 2):
+            self.lengthStart[n] += self.lengthStart[n - 1]
+        self.scores = array('H', (scores[i] for i in order))
+
+        size = tableSize(len(sortedWords))
+        self.table = hashTable(((w.encode('ascii'), i) for i, w in enumerate(sortedWords)), size)
+        self.mask = size - 1
+
+    @classmethod
+    def fromWordList(cls, wordList):
+        """ Builds a ColumnarLexicon from a wordList dict (word -> [score, len]) """
+        words = list(wordList)
+        return cls(words, [ wordList[w][0] for w in words ])
+
+    def word(self, i):
+        """ Returns word number i """
+        return self.words[self.offsets[i]:self.offsets[i + 1]].decode('ascii')
+
+    def find(self, word):
+        """ Returns the number of word, or -1 if it is not in the lexicon """
+        try:
+            key = word.encode('ascii')
+        except (AttributeError, UnicodeEncodeError):
+            return -1
+        table, offsets, words, mask = self.table, self.offsets, self.words, self.mask
+        h = zlib.crc32(key) & mask
+        while True:
+            i = table[h] - 1
+            if i < 0:
+                return -1
+            if words[offsets[i]:offsets[i + 1]] == key:
+                return i
+            h = (h + 1) & mask
+
+    # Mapping interface
+
+    def __getitem__(self, word):
+        i = self.find(word)
+        if i < 0:
+            raise KeyError(word)
+        return (self.scores[i], self.lengths[i])
+
+    def __contains__(self, word):
+        return self.find(word) >= 0
+
+    def __iter__(self):
+        words, offsets = self.words, self.offsets
+        for i in range(len(self.lengths)):
+            yield words[offsets[i]:offsets[i + 1]].decode('ascii')
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def items(self):
+        return _ColumnarItems(self)
+
+    # Scans
+
+    def lengthBuckets(self):
+        """ Returns the length buckets (n -> bucket) dealHand draws from """
+        return snapshotBuckets(self)
+
+    def playable(self, hand, maxLen=None, start=0, stop=None):
+        """
+        Yields the number of every word that can be made from the letters of
+        the hand, in word order.
+
+        hand: dictionary (string -> int)
+        maxLen: int, skip longer words (default: the number of letters in
+        the hand)
+        start, stop: int, only look at the words numbered from start up to
+        (not including) stop
+        """
+        counts = [ hand.get(ltr, 0) for ltr in 'abcdefghijklmnopqrstuvwxyz' ]
+        total = sum(counts)
+        if maxLen is None or maxLen > total:
+            maxLen = total
+        excluded = ~letterMask(ltr for ltr in hand if hand[ltr] > 0) & 0x3ffffff
+        end = self.lengthStart[min(maxLen, self.maxLen) + 1]
+        if stop is not None:
+            end = min(end, stop)
+        masks, words, offsets = self.masks, self.words, self.offsets
+        # Mask pre-filter: no letter outside the hand
+        for i in [ i for i, m in zip(range(start, end), masks[start:end]) if not m & excluded ]:
+            word = words[offsets[i]:offsets[i + 1]]
+            for code in set(word):
+                if word.count(code) > counts[code - _ORD_A]:
+                    break
+            else:
+                yield i
+
+    def nbytes(self):
+        """ Returns the number of bytes held in the arrays """
+        return len(self.words) + sum(a.itemsize * len(a) for a in
+                                     (self.offsets, self.scores, self.lengths, self.masks,
+                                      self.lengthStart, self.table))
+
+
+class _ColumnarItems(ItemsView):
+    """ items() of a ColumnarLexicon, read straight from the arrays """
+
+    def __iter__(self):
+        lexicon = self._mapping
+        words, offsets, scores, lengths = lexicon.words, lexicon.offsets, lexicon.scores, lexicon.lengths
+        for i in range(len(lengths)):
+            yield words[offsets[i]:offsets[i + 1]].decode('ascii'), (scores[i], lengths[i])
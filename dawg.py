@@ -0,0 +1,389 @@
+# -*- coding: utf-8 -*-
+""" Compact DAWG lexicon for the 6.00 Word Game
+
+A minimized directed acyclic word graph (DAWG) stores every word list
+prefix and suffix only once. The graph is flattened into a handful of
+arrays from the array module, so the whole lexicon costs a few bytes per
+word instead of a dict entry, a string, a list and two ints per word.
+
+Each node also records how many words can be reached from it. This gives
+every word a unique number (its position in sorted order), which is used
+to look up the word's score and length in parallel arrays. The words below
+a node are a range of word numbers, and the best score and the longest
+word in a range are bounded by those of blocks of SCORE_BLOCK words (see
+scoreBound).
+
+Dawg can be used in place of the wordList dict: it supports membership
+tests, wordList[word] (returning (score, len)) and iteration. It also
+serves dealHand and the move generation without any per-word string: its
+length buckets hold word numbers (see lengthBuckets) and its anagram index
+finds the words of a signature by walking the graph (see
+DawgAnagramIndex).
+"""
+
+from array import array
+from collections.abc import ItemsView, Mapping
+import sys
+
+from anagram import signature
+from randomdict import RandomBucket
+
+# Words per block of blockMax and blockMaxLen, the best score and the
+# longest word of every block of words
+SCORE_BLOCK = 32
+
+
+class _BuildNode(object):
+    """ Mutable node used while the DAWG is being built """
+    __slots__ = ('id', 'final', 'edges')
+
+    def __init__(self, nodeId):
+        self.id = nodeId
+        self.final = False
+        self.edges = {}
+
+    def key(self):
+        # Two nodes are equivalent if they are both final (or not) and have
+        # the same labelled edges to the same (already minimized) children
+        return (self.final, tuple((ltr, self.edges[ltr].id) for ltr in sorted(self.edges)))
+
+
+def _buildGraph(words):
+    """
+    Builds a minimized DAWG from sorted, unique words using the incremental
+    algorithm of Daciuk et al. Returns the root _BuildNode.
+    """
+    nextId = [1]
+    root = _BuildNode(0)
+    minimized = {}
+    unchecked = []  # (parent, letter, child) along the last inserted word
+
+    def newNode():
+        node = _BuildNode(nextId[0])
+        nextId[0] += 1
+        return node
+
+    def minimize(downTo):
+        for i in range(len(unchecked) - 1, downTo - 1, -1):
+            parent, ltr, child = unchecked.pop()
+            key = child.key()
+            if key in minimized:
+                parent.edges[ltr] = minimized[key]
+            else:
+                minimized[key] = child
+
+    previous = ''
+    for word in words:
+        if word <= previous:
+            raise ValueError("words must be sorted and unique: %r after %r" % (word, previous))
+        common = 0
+        for a, b in zip(word, previous):
+            if a != b:
+                break
+            common += 1
+        minimize(common)
+
+        node = unchecked[-1][2] if unchecked else root
+        for ltr in word[common:]:
+            child = newNode()
+            node.edges[ltr] = child
+            unchecked.append((node, ltr, child))
+            node = child
+        node.final = True
+        previous = word
+    minimize(0)
+    return root
+
+
+class _DawgItems(ItemsView):
+    """ Items view that walks the graph once instead of looking up each word """
+
+    def __iter__(self):
+        dawg = self._mapping
+        # words are yielded in sorted order, so the i-th word is word number i
+        for i, word in enumerate(dawg):
+            yield word, (dawg.scores[i], dawg.lengths[i])
+
+
+class Dawg(Mapping):
+    """ Array-backed minimized DAWG mapping word -> (score, len) """
+
+    def __init__(self, words, scores):
+        """
+        words: sorted list of unique lowercase strings
+        scores: list of int, scores[i] is the score of words[i]
+        """
+        root = _buildGraph(words)
+
+        # Number the nodes breadth first and flatten the edges into arrays.
+        # The edges of node i are edgeLabel/edgeTarget[firstEdge[i]:firstEdge[i+1]]
+        order = [root]
+        number = {root.id: 0}
+        i = 0
+        while i < len(order):
+            for ltr in sorted(order[i].edges):
+                child = order[i].edges[ltr]
+                if child.id not in number:
+                    number[child.id] = len(order)
+                    order.append(child)
+            i += 1
+
+        self.firstEdge = array('I', [0])
+        self.edgeLabel = array('B')
+        self.edgeTarget = array('I')
+        self.final = array('B')
+        for node in order:
+            for ltr in sorted(node.edges):
+                self.edgeLabel.append(ord(ltr))
+                self.edgeTarget.append(number[node.edges[ltr].id])
+            self.firstEdge.append(len(self.edgeLabel))
+            self.final.append(1 if node.final else 0)
+
+        # Number of words reachable from each node, computed children first
+        counts = {}
+        stack = [(root, False)]
+        while stack:
+            node, done = stack.pop()
+            if node.id in counts:
+                continue
+            if done:
+                counts[node.id] = node.final + sum(counts[c.id] for c in node.edges.values())
+            else:
+                stack.append((node, True))
+                stack.extend((c, False) for c in node.edges.values() if c.id not in counts)
+        self.wordCount = array('I', (counts[node.id] for node in order))
+
+        self.scores = array('H', scores)
+        self.lengths = array('B', (len(w) for w in words))
+        self.blockMax = array('H', (max(self.scores[i:i + SCORE_BLOCK])
+                                    for i in range(0, len(self.scores), SCORE_BLOCK)))
+        self.blockMaxLen = array('B', (max(self.lengths[i:i + SCORE_BLOCK])
+                                       for i in range(0, len(self.lengths), SCORE_BLOCK)))
+
+    @classmethod
+    def fromWordList(cls, wordList):
+        """
+        Builds a Dawg from a wordList dict (word -> [score, len]).
+        """
+        words = sorted(wordList)
+        return cls(words, [wordList[w][0] for w in words])
+
+    def _child(self, node, ltr):
+        """ Returns the node reached from node by letter ltr, or -1 """
+        code = ord(ltr)
+        for e in range(self.firstEdge[node], self.firstEdge[node + 1]):
+            if self.edgeLabel[e] == code:
+                return self.edgeTarget[e]
+        return -1
+
+    def prefixNode(self, prefix):
+        """
+        Returns the node reached by prefix, or -1 if no word starts with it.
+        """
+        node = 0
+        for ltr in prefix:
+            node = self._child(node, ltr)
+            if node < 0:
+                return -1
+        return node
+
+    def wordNumber(self, word):
+        """
+        Returns the position of word in sorted order, or -1 if the word is
+        not in the lexicon.
+        """
+        node = 0
+        idx = 0
+        for ltr in word:
+            # words ending at this node come before any longer word
+            idx += self.final[node]
+            code = ord(ltr)
+            nxt = -1
+            for e in range(self.firstEdge[node], self.firstEdge[node + 1]):
+                label = self.edgeLabel[e]
+                if label == code:
+                    nxt = self.edgeTarget[e]
+                    break
+                idx += self.wordCount[self.edgeTarget[e]]
+            if nxt < 0:
+                return -1
+            node = nxt
+        if not self.final[node]:
+            return -1
+        return idx
+
+    def scoreBound(self, first, count):
+        """
+        Returns upper bounds of the score and of the length of the count
+        words numbered from first: the best score and the longest word of
+        the blocks of SCORE_BLOCK words they fall in.
+        """
+        if count == 1:
+            return self.scores[first], self.lengths[first]
+        blocks = slice(first // SCORE_BLOCK, (first + count - 1) // SCORE_BLOCK + 1)
+        return max(self.blockMax[blocks]), max(self.blockMaxLen[blocks])
+
+    def __contains__(self, word):
+        return isinstance(word, str) and self.wordNumber(word) >= 0
+
+    def __getitem__(self, word):
+        i = self.wordNumber(word) if isinstance(word, str) else -1
+        if i < 0:
+            raise KeyError(word)
+        return (self.scores[i], self.lengths[i])
+
+    def __len__(self):
+        return self.wordCount[0]
+
+    def _walk(self, node, prefix, maxLen):
+        """ Yields (word, node) for words below node, in sorted order """
+        if self.final[node]:
+            yield prefix, node
+        if len(prefix) >= maxLen:
+            return
+        for e in range(self.firstEdge[node], self.firstEdge[node + 1]):
+            yield from self._walk(self.edgeTarget[e], prefix + chr(self.edgeLabel[e]), maxLen)
+
+    def __iter__(self):
+        for word, node in self._walk(0, '', sys.maxsize):
+            yield word
+
+    def items(self):
+        return _DawgItems(self)
+
+    def word(self, i):
+        """
+        Returns word number i (the i-th word in sorted order).
+        """
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        node = 0
+        letters = []
+        while True:
+            if self.final[node]:
+                if i == 0:
+                    return ''.join(letters)
+                i -= 1
+            # skip the children holding the words before word number i
+            for e in range(self.firstEdge[node], self.firstEdge[node + 1]):
+                target = self.edgeTarget[e]
+                if i < self.wordCount[target]:
+                    break
+                i -= self.wordCount[target]
+            letters.append(chr(self.edgeLabel[e]))
+            node = target
+
+    def anagrams(self, sig):
+        """
+        Returns the words spelled with exactly the letters of sig, in sorted
+        order. Only the branches whose letters are still left in sig are
+        visited.
+        """
+        counts = {}
+        for ltr in sig:
+            counts[ltr] = counts.get(ltr, 0) + 1
+        words = []
+        self._anagrams(0, '', counts, len(sig), words)
+        return words
+
+    def _anagrams(self, node, prefix, counts, left, words):
+        if left == 0:
+            if self.final[node]:
+                words.append(prefix)
+            return
+        for e in range(self.firstEdge[node], self.firstEdge[node + 1]):
+            ltr = chr(self.edgeLabel[e])
+            if counts.get(ltr):
+                counts[ltr] -= 1
+                self._anagrams(self.edgeTarget[e], prefix + ltr, counts, left - 1, words)
+                counts[ltr] += 1
+
+    def lengthBuckets(self):
+        """
+        Returns the words grouped by length (n -> RandomBucket of word
+        numbers), as wordgame.getLengthBuckets does for a dict.
+        """
+        numbers = {}
+        for i, n in enumerate(self.lengths):
+            if n not in numbers:
+                numbers[n] = array('I')
+            numbers[n].append(i)
+        return { n: RandomBucket(self.word, nums) for n, nums in numbers.items() }
+
+    def wordsOfLength(self, n):
+        """
+        Yields every word of exactly n letters, in sorted order. Branches
+        deeper than n are never visited.
+        """
+        for word, node in self._walk(0, '', n):
+            if len(word) == n:
+                yield word
+
+    def nbytes(self):
+        """
+        Returns the approximate memory footprint of the lexicon in bytes.
+        """
+        arrays = (self.firstEdge, self.edgeLabel, self.edgeTarget, self.final,
+                  self.wordCount, self.scores, self.lengths, self.blockMax, self.blockMaxLen)
+        return sys.getsizeof(self) + sum(sys.getsizeof(a) for a in arrays)
+
+    def nodeCount(self):
+        return len(self.final)
+
+
+class DawgAnagramIndex(Mapping):
+    """
+    Read-only anagram index (signature -> list of words) over a Dawg. The
+    words of a signature are found by walking the graph, so no string is
+    stored per word or per signature.
+    """
+
+    def __init__(self, dawg):
+        self.dawg = dawg
+
+    def __getitem__(self, sig):
+        words = self.get(sig)
+        if words is None:
+            raise KeyError(sig)
+        return words
+
+    def get(self, sig, default=None):
+        return self.dawg.anagrams(sig) or default
+
+    def __iter__(self):
+        # every distinct signature, in sorted order
+        return iter(sorted(set(signature(word) for word in self.dawg)))
+
+    def __len__(self):
+        return len(set(signature(word) for word in self.dawg))
+
+
+def dictFootprint(wordList):
+    """
+    Returns the approximate memory footprint in bytes of a wordList dict
+    (word -> [score, len]), counting the dict, the word strings, the value
+    lists and the ints they hold.
+    """
+    total = sys.getsizeof(wordList)
+    for word, val in wordList.items():
+        total += sys.getsizeof(word) + sys.getsizeof(val)
+        total += sum(sys.getsizeof(x) for x in val)
+    return total
+
+
+def footprintReport(wordList, dawg, buckets=None):
+    """
+    Returns a short report comparing the memory footprint of the wordList
+    dict with that of the Dawg built from it (and of its length buckets,
+    when given).
+    """
+    dictBytes = dictFootprint(wordList)
+    dawgBytes = dawg.nbytes()
+    if buckets is not None:
+        dawgBytes += sys.getsizeof(buckets) + sum(bucket.nbytes() for bucket in buckets.values())
+    return "\n".join([
+        "   dict: {:>12,} bytes ({:.1f} bytes/word)".format(dictBytes, dictBytes / max(len(wordList), 1)),
+        "   dawg: {:>12,} bytes ({:.1f} bytes/word, {:,} nodes)".format(
+            dawgBytes, dawgBytes / max(len(dawg), 1), dawg.nodeCount()),
+        "   saving: {:.1f}x".format(dictBytes / max(dawgBytes, 1)),
+    ])
@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+""" Incremental hand of letters for the 6.00 Word Game
+
+A Hand keeps the count of each of the 26 letters in a fixed list and a
+running total of the letters, so its length is known without summing and
+playing a word only touches the letters of the word. apply() and undo()
+update the hand in place, which lets a search try a word and take it back
+without allocating a new hand.
+
+Hand is a read-only Mapping (letter -> count, for the letters it holds),
+so it can be passed to every function that takes a hand dictionary:
+hand.get(ltr, 0), hand[ltr], hand.items() and iteration work as they do
+on a dict, and a Hand compares equal to the dict holding the same letters.
+"""
+
+from collections.abc import Mapping
+import random
+
+LETTERS = 'abcdefghijklmnopqrstuvwxyz'
+_ORD_A = ord('a')
+
+
+def _slot(ltr):
+    i = ord(ltr) - _ORD_A
+    if not 0 <= i < 26 or len(ltr) != 1:
+        raise ValueError("not a lowercase letter: " + repr(ltr))
+    return i
+
+
+class Hand(Mapping):
+    """ The letters of a hand as 26 counts and their total """
+    __slots__ = ('counts', 'total', '_key')
+
+    def __init__(self, letters=''):
+        """
+        letters: string, the letters of the hand (e.g. a word)
+        """
+        self.counts = [0] * 26
+        self.total = 0
+        self._key = None
+        for ltr in letters:
+            self.counts[_slot(ltr)] += 1
+        self.total = len(letters)
+
+    @classmethod
+    def fromDict(cls, hand):
+        """ Returns the Hand holding the letters of a hand dictionary (string -> int) """
+        if isinstance(hand, Hand):
+            return hand.copy()
+        new = cls()
+        for ltr, cnt in hand.items():
+            if cnt > 0:
+                new.counts[_slot(ltr)] += cnt
+                new.total += cnt
+        return new
+
+    def copy(self):
+        new = Hand.__new__(Hand)
+        new.counts = self.counts[:]
+        new.total = self.total
+        new._key = self._key
+        return new
+
+    def toDict(self):
+        """ Returns the hand as a dictionary (string -> int) """
+        return dict(self.items())
+
+    # Mapping interface: the letters held, in alphabetical order
+
+    def __getitem__(self, ltr):
+        try:
+            cnt = self.counts[_slot(ltr)]
+        except (ValueError, TypeError):
+            raise KeyError(ltr)
+        if cnt == 0:
+            raise KeyError(ltr)
+        return cnt
+
+    def get(self, ltr, default=None):
+        try:
+            cnt = self.counts[ord(ltr) - _ORD_A]
+        except (IndexError, TypeError):
+            return default
+        return cnt if cnt and len(ltr) == 1 and ltr >= 'a' else default
+
+    def __contains__(self, ltr):
+        return self.get(ltr, 0) > 0
+
+    def __iter__(self):
+        counts = self.counts
+        return (LETTERS[i] for i in range(26) if counts[i])
+
+    def __len__(self):
+        """ Number of distinct letters, as for a dict; see total for the letter count """
+        return sum(1 for cnt in self.counts if cnt)
+
+    def __bool__(self):
+        return self.total > 0
+
+    def __repr__(self):
+        return 'Hand(%r)' % self.key()
+
+    def __str__(self):
+        return ' '.join(self.key())
+
+    def __reduce__(self):
+        return (Hand, (self.key(),))
+
+    def key(self):
+        """
+        Returns the canonical key of the hand: its letters in alphabetical
+        order, the same string as anagram.handSignature. It is computed
+        once and kept until the hand changes.
+        """
+        if self._key is None:
+            self._key = ''.join(LETTERS[i] * cnt for i, cnt in enumerate(self.counts) if cnt)
+        return self._key
+
+    # Playing words
+
+    def canApply(self, word):
+        """ Returns True if every letter of word is in the hand (as often as in word) """
+        counts = self.counts
+        for i, ltr in enumerate(word):
+            j = ord(ltr) - _ORD_A
+            if not 0 <= j < 26 or counts[j] == 0:
+                for ltr in word[:i]:
+                    counts[ord(ltr) - _ORD_A] += 1
+                return False
+            counts[j] -= 1
+        for ltr in word:
+            counts[ord(ltr) - _ORD_A] += 1
+        return True
+
+    def apply(self, word):
+        """
+        Removes the letters of word from the hand, in place.
+
+        raises ValueError (leaving the hand unchanged) if the hand does not
+        hold every letter of word
+        """
+        counts = self.counts
+        for i, ltr in enumerate(word):
+            j = ord(ltr) - _ORD_A
+            if not 0 <= j < 26 or counts[j] == 0:
+                for ltr in word[:i]:
+                    counts[ord(ltr) - _ORD_A] += 1
+                raise ValueError("cannot play " + repr(word) + " from the hand")
+            counts[j] -= 1
+        self.total -= len(word)
+        self._key = None
+
+    def undo(self, word):
+        """ Puts the letters of word back in the hand, in place (reverses apply) """
+        counts = self.counts
+        for ltr in word:
+            counts[_slot(ltr)] += 1
+        self.total += len(word)
+        self._key = None
+
+    def shuffled(self, rng=None):
+        """ Returns the letters of the hand in random order, separated by spaces """
+        letters = list(self.key())
+        (rng or random).shuffle(letters)
+        return ' '.join(letters)
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+""" LRU cache of move-generation results for the 6.00 Word Game
+
+The computer player asks for the ranked candidate words of the same hand
+states again and again: every turn of a replayed hand, and common sub-hands
+such as 'erst' that come up across different deals. HandCache keeps the
+most recently used results, keyed by a canonical form of the hand, and
+evicts the least recently used one when it is full.
+
+A HandCache can be shared by threads: every operation holds the cache's
+lock for the few dict operations it does.
+"""
+
+from collections import OrderedDict
+import threading
+
+
+class HandCache(object):
+    """ Bounded least-recently-used cache with hit/miss/eviction counters """
+
+    def __init__(self, capacity=4096):
+        """
+        capacity: int >= 0, maximum number of entries (0 disables caching)
+        """
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def capacity(self):
+        return self._capacity
+
+    @capacity.setter
+    def capacity(self, capacity):
+        """ Changing the capacity evicts entries until the cache fits """
+        with self._lock:
+            self._capacity = capacity
+            self._evict()
+
+    def _evict(self):
+        # called with the lock held
+        while len(self._entries) > self._capacity:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, key, default=None):
+        """
+        Returns the value cached for key (marking it most recently used), or
+        default if key is not cached.
+        """
+        with self._lock:
+            try:
+                value = self._entries[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """
+        Caches value for key, evicting the least recently used entry if the
+        cache is full.
+        """
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            self._evict()
+
+    def clear(self):
+        """ Drops every entry, e.g. when the word list is reloaded """
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def stats(self):
+        """
+        Returns a dict with the size, capacity and counters of the cache.
+        """
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'capacity': self._capacity,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hitRate': self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+""" As-you-type hints over a hand for the 6.00 Word Game
+
+Answers prefix questions about a hand with the Dawg of the word list (see
+dawg.py): which words starting with a prefix can be made from the letters
+of the hand, best first, and whether a prefix is a dead end.
+
+The search starts at the node of the prefix and only follows the edges
+whose letter the hand still holds, so it never looks at words the hand
+cannot make. Along the way it keeps the position of every node in sorted
+order, as Dawg.wordNumber does, which gives the score of a word as soon as
+it is reached, and the range of the words below the node, whose best score
+bounds theirs (see Dawg.scoreBound). The children of a node are visited
+best bound first, so the high-scoring words are found early, and once k
+words are found a child whose bound is below the k-th best score is not
+visited at all.
+
+completions() stops after its time budget and returns the best words found
+so far, flagging the result as incomplete, so a hint never takes longer
+than the budget allows.
+"""
+
+import bisect
+from collections import namedtuple
+import time
+
+from anagram import BONUS
+from dawg import SCORE_BLOCK
+
+# Part of the time budget kept for the node being expanded when the time is
+# up and for returning the result
+BUDGET_MARGIN = 0.05
+
+Hints = namedtuple('Hints', 'words complete found')
+Hints.__doc__ = """
+Result of completions: words is a list of (score, word) pairs, best first
+(ties in alphabetical order); complete is False if the time budget ran out
+before every completion was seen; found is the number of completions seen.
+"""
+
+
+def handCounts(hand):
+    """ Returns the 26 letter counts of a hand dictionary (string -> int) """
+    return [ hand.get(chr(97 + i), 0) for i in range(26) ]
+
+
+def _start(dawg, counts, prefix):
+    """
+    Takes the letters of prefix out of counts and returns (node, position)
+    for the prefix, or None if the hand or the lexicon rules it out.
+    """
+    node = 0
+    idx = 0
+    firstEdge, edgeLabel, edgeTarget = dawg.firstEdge, dawg.edgeLabel, dawg.edgeTarget
+    for ltr in prefix:
+        code = ord(ltr)
+        if not 97 <= code <= 122 or counts[code - 97] == 0:
+            return None
+        counts[code - 97] -= 1
+        idx += dawg.final[node]
+        nxt = -1
+        for e in range(firstEdge[node], firstEdge[node + 1]):
+            if edgeLabel[e] == code:
+                nxt = edgeTarget[e]
+                break
+            idx += dawg.wordCount[edgeTarget[e]]
+        if nxt < 0:
+            return None
+        node = nxt
+    return node, idx
+
+
+def _search(dawg, counts, prefix, node, idx, n=0, deadline=None, floor=None):
+    """
+    Depth-first search below node for the words the counts allow, visiting
+    the children with the best score bound first (see Dawg.scoreBound).
+    Yields (score, word number, word) for every one found, scores including
+    the bonus for words of n letters; stops at the deadline (perf_counter
+    time) by raising TimeoutError from the generator.
+
+    floor: one element list, the lowest score still wanted; the caller may
+    raise it between words, and the children whose bound is below it are
+    skipped (default: every word is yielded)
+    """
+    firstEdge, edgeLabel, edgeTarget = dawg.firstEdge, dawg.edgeLabel, dawg.edgeTarget
+    final, wordCount, scores = dawg.final, dawg.wordCount, dawg.scores
+    lengths, blockMax, blockMaxLen = dawg.lengths, dawg.blockMax, dawg.blockMaxLen
+    if floor is None:
+        floor = [0]
+    # Each entry: (node, position, word so far, letter taken, score bound);
+    # counts hold the letters left once the entry's word is taken out,
+    # restored on the way back up
+    stack = [(node, idx, prefix, None, None)]
+    while stack:
+        node, idx, word, undo, bound = stack.pop()
+        if node < 0:
+            # marker: put the letter back when leaving its subtree
+            counts[undo] += 1
+            continue
+        if undo is not None:
+            counts[undo] -= 1
+            if bound < floor[0]:
+                # The floor has risen since the child was pushed
+                continue
+        # A node costs a few microseconds: check the time at every one, so
+        # the budget is not overrun by more than that
+        if deadline is not None and time.perf_counter() > deadline:
+            raise TimeoutError()
+        if final[node]:
+            yield scores[idx] + (BONUS if len(word) == n else 0), idx, word
+        childIdx = idx + final[node]
+        children = []
+        for e in range(firstEdge[node], firstEdge[node + 1]):
+            target = edgeTarget[e]
+            count = wordCount[target]
+            slot = edgeLabel[e] - 97
+            if 0 <= slot < 26 and counts[slot]:
+                # Dawg.scoreBound of the words below the child, inlined
+                if count == 1:
+                    bound, longest = scores[childIdx], lengths[childIdx]
+                else:
+                    first, last = childIdx // SCORE_BLOCK, (childIdx + count - 1) // SCORE_BLOCK
+                    if first == last:
+                        bound, longest = blockMax[first], blockMaxLen[first]
+                    else:
+                        bound, longest = max(blockMax[first:last + 1]), max(blockMaxLen[first:last + 1])
+                if longest >= n:
+                    bound += BONUS
+                if bound >= floor[0]:
+                    children.append((bound, -slot, target, childIdx))
+            childIdx += count
+        # Visit the best bound first (alphabetical on equal bounds): push
+        # the children worst first, sorted by (bound, -letter)
+        if len(children) > 1:
+            children.sort()
+        for bound, negSlot, target, childIdx in children:
+            stack.append((-1, 0, None, -negSlot, None))
+            stack.append((target, childIdx, word + chr(97 - negSlot), -negSlot, bound))
+
+
+def completions(dawg, hand, prefix='', k=10, budget=0.001, n=None):
+    """
+    Returns the best k words starting with prefix that can be made from the
+    letters of the hand (prefix included), as Hints.
+
+    dawg: Dawg of the word list
+    hand: dictionary (string -> int) or Hand
+    prefix: string, the letters typed so far
+    k: int, number of words to return
+    budget: float, seconds the search may take (None: no limit)
+    n: int, hand size for the bonus of getWordScore (default: the number of
+    letters in the hand)
+    returns: Hints
+    """
+    deadline = None if budget is None else time.perf_counter() + budget * (1 - BUDGET_MARGIN)
+    counts = handCounts(hand)
+    if n is None:
+        n = sum(counts)
+    start = _start(dawg, counts, prefix)
+    if start is None:
+        return Hints([], True, 0)
+
+    # (-score, word) pairs: best first, ties in alphabetical order
+    best = []
+    # Once k words are found, only a word scoring at least the k-th best
+    # can still make the list (a tie may still come first alphabetically)
+    floor = [0]
+    complete = True
+    found = 0
+    try:
+        for score, i, word in _search(dawg, counts, prefix, start[0], start[1], n, deadline, floor):
+            found += 1
+            entry = (-score, word)
+            if len(best) < k or entry < best[-1]:
+                bisect.insort(best, entry)
+                del best[k:]
+                if len(best) == k:
+                    floor[0] = -best[-1][0]
+    except TimeoutError:
+        complete = False
+    return Hints([ (-score, word) for score, word in best ], complete, found)
+
+
+def isDeadEnd(dawg, hand, prefix):
+    """
+    Returns True if no word starting with prefix can be made from the
+    letters of the hand (prefix included).
+    """
+    counts = handCounts(hand)
+    start = _start(dawg, counts, prefix)
+    if start is None:
+        return True
+    for found in _search(dawg, counts, prefix, start[0], start[1]):
+        return False
+    return True
+
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+""" Streaming word list ingest for the 6.00 Word Game
+
+Reads one or more word list files (plain, gzip or bz2 compressed, one word
+per line) as a pipeline of generators that works on chunks of words rather
+than on single words:
+
+    readWords(paths) -> chunks(words) -> scoreChunks(chunks) -> ingest()
+
+Only one chunk of words is in flight at a time, so apart from the
+resulting word list the memory used while loading does not depend on the
+size of the files. Words that appear in more than one file (or more than
+once in a file) are kept once, with the first occurrence winning.
+
+Progress reports the words read, the share of the input consumed and the
+rate in words per second while loading.
+"""
+
+import bz2
+import gzip
+import io
+import os
+import sys
+import time
+
+CHUNK_SIZE = 65536
+
+# First bytes of the compressed formats, see openWordFile
+GZIP_MAGIC = b'\x1f\x8b'
+BZ2_MAGIC = b'BZh'
+
+
+class Progress(object):
+    """
+    Reports the progress of an ingest on stream, at most every interval
+    seconds. Updates are only drawn when stream is a terminal.
+    """
+
+    def __init__(self, totalBytes=0, stream=None, interval=0.5):
+        self.totalBytes = totalBytes
+        self.stream = sys.stderr if stream is None else stream
+        self.interval = interval
+        self.words = 0
+        self.bytes = 0
+        self.start = time.perf_counter()
+        self.last = self.start
+        self.live = hasattr(self.stream, 'isatty') and self.stream.isatty()
+
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+    def rate(self):
+        """ Returns the words read per second so far """
+        elapsed = self.elapsed()
+        return self.words / elapsed if elapsed else 0.0
+
+    def update(self, words):
+        """ Records that words more words were read """
+        self.words += words
+        now = time.perf_counter()
+        if self.live and now - self.last >= self.interval:
+            self.last = now
+            self.stream.write('\r   ' + self.status())
+            self.stream.flush()
+
+    def status(self):
+        text = "{:,} words read ({:,.0f} words/s)".format(self.words, self.rate())
+        if self.totalBytes:
+            text += " {:5.1%}".format(min(self.bytes / self.totalBytes, 1.0))
+        return text
+
+    def finish(self):
+        """ Clears the progress line and returns a summary of the ingest """
+        if self.live:
+            self.stream.write('\r' + ' ' * 70 + '\r')
+            self.stream.flush()
+        return "{:,} words read in {:.2f}s ({:,.0f} words/s)".format(self.words, self.elapsed(), self.rate())
+
+
+def openWordFile(path):
+    """
+    Opens a word list file for reading as text, decompressing gzip and bz2
+    files (recognized by their first bytes, whatever their name).
+
+    returns: tuple (text file, raw file); raw.tell() is the number of bytes
+    of the file consumed so far
+    """
+    raw = open(path, 'rb')
+    magic = raw.peek(3)[:3]
+    if magic.startswith(GZIP_MAGIC):
+        binary = gzip.GzipFile(fileobj=raw)
+    elif magic.startswith(BZ2_MAGIC):
+        binary = bz2.BZ2File(raw)
+    else:
+        binary = raw
+    return io.TextIOWrapper(binary, encoding='utf-8', errors='replace'), raw
+
+
+def readWords(paths, progress=None):
+    """
+    Yields the words of the files in paths, in order, as lowercase strings.
+    Blank lines and words with characters other than the letters a-z (such
+    as "o'clock", which could never be dealt or played) are skipped.
+
+    progress: Progress, whose bytes are kept up to date with the input consumed
+    """
+    consumed = 0
+    for path in paths:
+        text, raw = openWordFile(path)
+        with text:
+            for i, line in enumerate(text):
+                word = line.strip().lower()
+                if word.isascii() and word.isalpha():
+                    yield word
+                if progress is not None and i & 0x3fff == 0:
+                    progress.bytes = consumed + raw.tell()
+            consumed += raw.tell()
+        if progress is not None:
+            progress.bytes = consumed
+
+
+def chunks(words, size=CHUNK_SIZE):
+    """ Yields the words as lists of at most size words """
+    chunk = []
+    for word in words:
+        chunk.append(word)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def scoreChunks(wordChunks, score, maxLen=None, progress=None):
+    """
+    Yields each chunk of words as a list of (word, score(word)), leaving out
+    the words longer than maxLen.
+
+    progress: Progress, updated with the words of every chunk
+    """
+    for chunk in wordChunks:
+        if progress is not None:
+            progress.update(len(chunk))
+        if maxLen is not None:
+            chunk = [ word for word in chunk if len(word) <= maxLen ]
+        yield [ (word, score(word)) for word in chunk ]
+
+
+def ingest(paths, score, maxLen=None, chunkSize=CHUNK_SIZE, progress=None):
+    """
+    Reads the word list files in paths and returns the word list as a dict
+    (word -> [score, len]), as loadWords builds it.
+
+    paths: list of file paths (plain, gzip or bz2)
+    score: function (word -> int) scoring a word
+    maxLen: int, words longer than this are left out (default: none are)
+    chunkSize: int, words per chunk
+    progress: Progress reporting the ingest (default: none)
+    """
+    wordList = {}
+    for chunk in scoreChunks(chunks(readWords(paths, progress), chunkSize), score, maxLen, progress):
+        for word, wordScore in chunk:
+            if word not in wordList:
+                wordList[word] = [ wordScore, len(word) ]
+    return wordList
+
+
+def totalSize(paths):
+    """ Returns the total size in bytes of the files in paths """
+    return sum(os.path.getsize(path) for path in paths)
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+""" Lazily scored word list for the 6.00 Word Game
+
+loadWords scores every word of the word list before the first hand is
+dealt, though a game only ever looks up the scores of a few hundred words.
+A LazyLexicon only numbers the words at load time and scores a word the
+first time its score is asked for:
+
+    numbers  dict (word -> int), membership and word number
+    words    list of the words, by number
+    scores   uint16[N], the score of each word, UNSCORED until needed
+
+A word is scored by translating its bytes to letter values with a
+translate table and summing them, so scoring is a couple of C calls per
+word. When every score is about to be needed anyway (building a Dawg or a
+letter matrix), scoreAll() scores the whole list in bulk, with NumPy when
+it is installed.
+
+LazyLexicon is a read-only Mapping (word -> (score, len)), so it can be
+used as a wordList; lexicon[word] scores the word if it has not been yet.
+"""
+
+from array import array
+from collections.abc import Mapping
+
+from lettermatrix import np
+from randomdict import RandomDict
+
+# Score of a word that has not been scored yet (no word scores that much)
+UNSCORED = 0xffff
+
+
+def scoreTable(values):
+    """ Returns the translate table mapping each letter's byte to its value """
+    return bytes(values.get(chr(code), 0) for code in range(256))
+
+
+class LazyLexicon(Mapping):
+    """ Read-only wordList (word -> (score, len)) scored on demand """
+
+    def __init__(self, words, values):
+        """
+        words: iterable of lowercase ASCII strings (duplicates are ignored)
+        values: dictionary (string -> int), the letter values
+        """
+        self.numbers = {}
+        for word in words:
+            self.numbers.setdefault(word, len(self.numbers))
+        self.words = list(self.numbers)
+        self.scores = array('H', [UNSCORED]) * len(self.words)
+        self.table = scoreTable(values)
+        # Number of words scored so far
+        self.scored = 0
+
+    def score(self, word):
+        """ Returns the score of word (which need not be in the lexicon) """
+        return sum(word.encode('ascii').translate(self.table)) * len(word)
+
+    # Mapping interface
+
+    def __getitem__(self, word):
+        i = self.numbers[word]
+        score = self.scores[i]
+        if score == UNSCORED:
+            score = self.scores[i] = self.score(word)
+            self.scored += 1
+        return (score, len(word))
+
+    def __contains__(self, word):
+        return word in self.numbers
+
+    def __iter__(self):
+        return iter(self.words)
+
+    def __len__(self):
+        return len(self.words)
+
+    def scoreAll(self):
+        """ Scores every word not scored yet, in bulk """
+        if self.scored == len(self.words):
+            return
+        if np is not None and self.words:
+            # Sum the letter values of every word at once over the
+            # translated bytes of the whole list
+            data = ''.join(self.words).encode('ascii').translate(self.table)
+            lengths = np.fromiter(map(len, self.words), dtype=np.int64, count=len(self.words))
+            starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+            sums = np.add.reduceat(np.frombuffer(data, dtype=np.uint8).astype(np.int64), starts)
+            self.scores = array('H', (sums * lengths).astype(np.uint16).tobytes())
+        else:
+            table, scores = self.table, self.scores
+            for i, word in enumerate(self.words):
+                if scores[i] == UNSCORED:
+                    scores[i] = sum(word.encode('ascii').translate(table)) * len(word)
+        self.scored = len(self.words)
+
+    def lengthBuckets(self):
+        """
+        Returns the words grouped by length for dealHand, as
+        wordgame.getLengthBuckets does but without scoring them: a dict
+        mapping each word length to a RandomDict (word -> None).
+        """
+        groups = {}
+        for word in self.words:
+            groups.setdefault(len(word), []).append(word)
+        return { length: RandomDict(dict.fromkeys(words)) for length, words in groups.items() }
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+""" NumPy letter-count matrix for the 6.00 Word Game
+
+Stores the word list as an N x 26 uint8 matrix of letter counts, together
+with arrays of word scores and word lengths. Finding every word that can
+be made from a hand is then a single broadcast comparison against the
+hand's letter-count vector, and the best words are picked with argpartition.
+
+NumPy is optional: HAVE_NUMPY is False when it cannot be imported, and
+callers are expected to fall back to the pure-Python move generation.
+"""
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from anagram import BONUS, rankKey
+
+HAVE_NUMPY = np is not None
+
+ALPHABET = 'abcdefghijklmnopqrstuvwxyz'
+
+
+class LetterMatrix(object):
+    """ Vectorized view of a word list (word -> [score, len]) """
+
+    def __init__(self, wordList):
+        """
+        Builds the letter-count matrix, score and length arrays for the
+        words in wordList. Words containing characters outside a-z are
+        left out, since they cannot be made from any hand.
+
+        wordList: dict (string -> list), list[0] is the word score
+        """
+        if not HAVE_NUMPY:
+            raise ImportError("LetterMatrix requires numpy")
+
+        words = [w for w in wordList if w.isalpha() and w.isascii() and w.islower()]
+        self.words = words
+        self.lengths = np.fromiter((len(w) for w in words), dtype=np.uint8, count=len(words))
+        self.scores = np.fromiter((wordList[w][0] for w in words), dtype=np.int32, count=len(words))
+
+        # Count every letter of every word in one pass: each byte of the
+        # concatenated words is attributed to the row of the word it came from
+        letters = np.frombuffer(''.join(words).encode('ascii'), dtype=np.uint8) - ord('a')
+        rows = np.repeat(np.arange(len(words)), self.lengths)
+        self.counts = np.zeros((len(words), 26), dtype=np.uint8)
+        np.add.at(self.counts, (rows, letters), 1)
+
+    def __len__(self):
+        return len(self.words)
+
+    def handVector(self, hand):
+        """
+        Returns the 26 element letter-count vector of the hand.
+
+        hand: dictionary (string -> int)
+        """
+        vec = np.zeros(26, dtype=np.uint8)
+        for ltr, cnt in hand.items():
+            if cnt > 0 and ltr in ALPHABET:
+                vec[ord(ltr) - ord('a')] = min(cnt, 255)
+        return vec
+
+    def playable(self, hand):
+        """
+        Returns the row numbers of all words that can be made from the hand.
+
+        hand: dictionary (string -> int)
+        returns: numpy array of int
+        """
+        vec = self.handVector(hand)
+        mask = (self.counts <= vec).all(axis=1)
+        return np.flatnonzero(mask)
+
+    def topK(self, hand, n, k):
+        """
+        Returns up to k (score, word) pairs for the best words that can be
+        made from the hand, best first (ties in alphabetical order, as in
+        wordgame.topCandidates). Scores include the BONUS for words of
+        length n, like getWordScore.
+
+        hand: dictionary (string -> int)
+        n: integer (HAND_SIZE; i.e., hand size required for additional points)
+        k: integer > 0
+        returns: list of (int, string)
+        """
+        rows = self.playable(hand)
+        if len(rows) == 0:
+            return []
+        scores = self.scores[rows] + BONUS * (self.lengths[rows] == n)
+        if len(rows) > k:
+            # Keep every word scoring at least the k-th best score, so that
+            # the words tied with it can be ranked alphabetically below
+            kth = -np.partition(-scores, k - 1)[k - 1]
+            keep = scores >= kth
+            rows, scores = rows[keep], scores[keep]
+        ranked = sorted(((int(score), self.words[row]) for score, row in zip(scores, rows)),
+                        key=rankKey)
+        return ranked[:k]
@@ -0,0 +1,451 @@
+# -*- coding: utf-8 -*-
+""" Precompiled lexicon snapshot for the 6.00 Word Game
+
+The first time the word list is loaded, its words, scores, lengths and
+anagram signatures are written to a binary snapshot next to the source
+file (words.txt -> words.txt.lexcache). Later runs mmap the snapshot
+instead of re-reading and re-scoring every word in the source file.
+The same layout is used to publish the lexicon in shared memory (see
+sharedlex.py), and SnapshotLexicon/SnapshotAnagramIndex give dict-like
+access to it without copying it into Python objects.
+
+The snapshot records the size, mtime and SHA-256 hash of the source file.
+It is used as long as the size and mtime still match; if they don't, the
+hash is compared so that touching the file does not force a rebuild.
+
+Layout (all integers in native byte order, sections 8-byte aligned):
+
+    header      see HEADER
+    offsets     uint32[count + 1]  start of word i in the word blob
+    scores      uint16[count]      getWordScore_init(word i)
+    lengths     uint8[count]       len(word i)
+    lengthStart uint32[maxLen + 2] words of length n are [lengthStart[n], lengthStart[n + 1])
+    words       bytes              every word followed by '\\n'
+    signatures  bytes              signature of every word followed by '\\n'
+    sigOrder    uint32[count]      word numbers sorted by (length, signature, word)
+    counts      uint8[count * 26]  letter counts of word i at [26 * i, 26 * i + 26)
+    wordTable   uint32[tableSize]  hash table of the words: word number + 1, or 0
+    sigTable    uint32[tableSize]  hash table of the signatures: position + 1 of
+                                   the first word with the signature in sigOrder
+
+The hash tables use crc32 of the word (or signature) and linear probing;
+tableSize is the smallest power of two of at least twice count, so
+lookups in place take one or two probes.
+
+Words are sorted by (length, word), so the words of at most n letters are
+always a prefix of the snapshot.
+"""
+
+from array import array
+from collections.abc import Mapping
+import hashlib
+import mmap
+import os
+import struct
+import zlib
+
+from anagram import signature
+from randomdict import RandomBucket
+
+MAGIC = b'WGLEX\x00\x00\x00'
+VERSION = 2
+SUFFIX = '.lexcache'
+
+# magic, version, byte order mark, count, maxLen, blob length,
+# source size, source mtime (ns), source sha256
+HEADER = struct.Struct('=8sIIIIQQq32s')
+BYTE_ORDER_MARK = 0x01020304
+
+
+def snapshotPath(source):
+    """ Returns the path of the snapshot for the word list file source """
+    return source + SUFFIX
+
+
+def fileHash(path):
+    """ Returns the SHA-256 digest of the file at path """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.digest()
+
+
+def _align(n):
+    return (n + 7) & ~7
+
+
+def tableSize(count):
+    """ Returns the number of slots of the hash tables of a snapshot of count words """
+    size = 1
+    while size < 2 * count:
+        size <<= 1
+    return size
+
+
+def hashTable(keys, size):
+    """
+    Returns an open addressing hash table (crc32, linear probing) of size
+    slots, a power of two, as a uint32 array.
+
+    keys: iterable of (bytes, int); the slot of each key holds its int + 1,
+    empty slots hold 0
+    """
+    table = array('I', [0]) * size
+    mask = size - 1
+    for key, value in keys:
+        h = zlib.crc32(key) & mask
+        while table[h]:
+            h = (h + 1) & mask
+        table[h] = value + 1
+    return table
+
+
+def iterSnapshot(words, scores, stamp=(0, 0, bytes(32))):
+    """
+    Yields the snapshot of the lexicon as a sequence of bytes-like chunks
+    (the header, then each section with its padding). The sections are
+    built one at a time and dropped once yielded, and only arrays and lists
+    of references are kept in between, so writing a snapshot does not hold
+    it (or a Python object per word and section) in memory at once.
+
+    words: list of lowercase strings
+    scores: list of int, scores[i] is the score of words[i]
+    stamp: tuple (size, mtime in ns, sha256 digest) of the source file
+    """
+    # Two stable sorts by existing keys instead of one by (len, word) tuples
+    order = list(range(len(words)))
+    order.sort(key=words.__getitem__)
+    order.sort(key=lambda i: len(words[i]))
+    order = array('I', order)
+    sortedWords = [words[i] for i in order]
+    maxLen = max((len(w) for w in sortedWords), default=0)
+
+    offsets = array('I', [0])
+    lengthStart = array('I', [0]) * (maxLen + 2)
+    for word in sortedWords:
+        offsets.append(offsets[-1] + len(word) + 1)
+        lengthStart[len(word) + 1] += 1
+    # lengthStart[n] is the number of words shorter than n letters
+    for n in range(1, maxLen + 2):
+        lengthStart[n] += lengthStart[n - 1]
+    blobLen = offsets[-1]
+
+    pos = HEADER.size
+    yield HEADER.pack(MAGIC, VERSION, BYTE_ORDER_MARK, len(sortedWords), maxLen,
+                      blobLen, stamp[0], stamp[1], stamp[2])
+
+    def section(data):
+        nonlocal pos
+        pad = _align(pos) - pos
+        pos += pad + len(data)
+        return b'\0' * pad + data
+
+    yield section(offsets.tobytes())
+    del offsets
+    yield section(array('H', (scores[i] for i in order)).tobytes())
+    del order
+    yield section(array('B', (len(w) for w in sortedWords)).tobytes())
+    yield section(lengthStart.tobytes())
+    yield section(''.join(w + '\n' for w in sortedWords).encode('ascii'))
+
+    sigs = [signature(w) for w in sortedWords]
+    yield section(''.join(sig + '\n' for sig in sigs).encode('ascii'))
+    # The words are in (length, word) order: sorting their numbers stably
+    # by signature, then by length, orders them by (length, signature, word)
+    sigOrder = list(range(len(sigs)))
+    sigOrder.sort(key=sigs.__getitem__)
+    sigOrder.sort(key=lambda i: len(sigs[i]))
+    sigOrder = array('I', sigOrder)
+    yield section(sigOrder.tobytes())
+
+    counts = bytearray(26 * len(sortedWords))
+    base = 0
+    for word in sortedWords:
+        for code in word.encode('ascii'):
+            if 97 <= code <= 122:
+                counts[base + code - 97] += 1
+        base += 26
+    yield section(bytes(counts))
+    del counts
+
+    size = tableSize(len(sortedWords))
+    yield section(hashTable(((w.encode('ascii'), i) for i, w in enumerate(sortedWords)), size).tobytes())
+    firsts = ((sigs[i].encode('ascii'), p) for p, i in enumerate(sigOrder)
+              if p == 0 or sigs[sigOrder[p - 1]] != sigs[i])
+    yield section(hashTable(firsts, size).tobytes())
+
+
+def packSnapshot(words, scores, stamp=(0, 0, bytes(32))):
+    """
+    Returns the snapshot of the lexicon as bytes, see iterSnapshot.
+    """
+    return b''.join(iterSnapshot(words, scores, stamp))
+
+
+def writeSnapshot(source, words, scores, path=None):
+    """
+    Writes a snapshot of the lexicon built from the file source, one
+    section at a time (see iterSnapshot).
+
+    The snapshot is written to a temporary file and moved into place, so
+    a reader never sees a partially written snapshot.
+
+    source: string, path of the word list file the words were read from
+    words: list of lowercase strings
+    scores: list of int, scores[i] is the score of words[i]
+    path: string, defaults to snapshotPath(source)
+    """
+    if path is None:
+        path = snapshotPath(source)
+    stat = os.stat(source)
+    stamp = (stat.st_size, stat.st_mtime_ns, fileHash(source))
+
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        for chunk in iterSnapshot(words, scores, stamp):
+            f.write(chunk)
+    os.replace(tmp, path)
+
+
+class LexiconSnapshot(object):
+    """ Read-only view of a snapshot held in a buffer (usually an mmap) """
+
+    def __init__(self, buf):
+        """
+        buf: bytes-like object holding a snapshot, see writeSnapshot
+        """
+        self.buf = buf
+        view = memoryview(buf)
+        (magic, version, bom, count, maxLen, blobLen,
+         self.sourceSize, self.sourceMtime, self.sourceHash) = HEADER.unpack_from(view, 0)
+        if magic != MAGIC or version != VERSION or bom != BYTE_ORDER_MARK:
+            raise ValueError("not a compatible lexicon snapshot")
+        self.count = count
+        self.maxLen = maxLen
+
+        pos = HEADER.size
+        sizes = [4 * (count + 1), 2 * count, count, 4 * (maxLen + 2), blobLen, blobLen,
+                 4 * count, 26 * count, 4 * tableSize(count), 4 * tableSize(count)]
+        sections = []
+        for size in sizes:
+            pos = _align(pos)
+            sections.append(view[pos:pos + size])
+            pos += size
+        if pos > len(view):
+            raise ValueError("truncated lexicon snapshot")
+        self.offsets = sections[0].cast('I')
+        self.scores = sections[1].cast('H')
+        self.lengths = sections[2]
+        self.lengthStart = sections[3].cast('I')
+        self.words = sections[4]
+        self.signatures = sections[5]
+        self.sigOrder = sections[6].cast('I')
+        self.counts = sections[7]
+        self.wordTable = sections[8].cast('I')
+        self.sigTable = sections[9].cast('I')
+        self.mask = len(self.wordTable) - 1
+
+    def end(self, n):
+        """ Returns the number of words of at most n letters """
+        return self.lengthStart[min(max(n, 0), self.maxLen) + 1]
+
+    def word(self, i):
+        """ Returns word number i """
+        return str(self.words[self.offsets[i]:self.offsets[i + 1] - 1], 'ascii')
+
+    def find(self, word):
+        """
+        Returns the number of word, or -1 if it is not in the snapshot.
+        """
+        key = word.encode('ascii', 'replace')
+        table, offsets, words, mask = self.wordTable, self.offsets, self.words, self.mask
+        h = zlib.crc32(key) & mask
+        while True:
+            i = table[h] - 1
+            if i < 0:
+                return -1
+            if words[offsets[i]:offsets[i + 1] - 1] == key:
+                return i
+            h = (h + 1) & mask
+
+    def anagrams(self, sig):
+        """
+        Returns the numbers of the words with signature sig, in word order.
+        """
+        key = sig.encode('ascii', 'replace')
+        table, offsets, sigs, order, mask = self.sigTable, self.offsets, self.signatures, self.sigOrder, self.mask
+        h = zlib.crc32(key) & mask
+        while True:
+            pos = table[h] - 1
+            if pos < 0:
+                return []
+            i = order[pos]
+            if sigs[offsets[i]:offsets[i + 1] - 1] == key:
+                break
+            h = (h + 1) & mask
+        result = []
+        end = self.lengthStart[len(sig) + 1]
+        while pos < end:
+            i = order[pos]
+            if sigs[offsets[i]:offsets[i + 1] - 1] != key:
+                break
+            result.append(i)
+            pos += 1
+        return result
+
+    def letterCounts(self, i):
+        """ Returns the 26 letter counts of word number i as bytes """
+        return bytes(self.counts[26 * i:26 * i + 26])
+
+    def _strings(self, blob, n):
+        # Words of at most n letters are a prefix of the blob
+        end = self.end(n)
+        if end == 0:
+            return []
+        return str(blob[:self.offsets[end] - 1], 'ascii').split('\n')
+
+    def wordList(self, n):
+        """
+        Returns the wordList dict (word -> [score, len]) for the words of
+        at most n letters, as loadWords does.
+        """
+        words = self._strings(self.words, n)
+        scores = self.scores[:len(words)]
+        lengths = self.lengths[:len(words)]
+        return { w: [s, l] for w, s, l in zip(words, scores, lengths) }
+
+    def anagramIndex(self, n):
+        """
+        Returns the anagram index (signature -> list of words) for the words
+        of at most n letters, see anagram.buildAnagramIndex.
+        """
+        index = {}
+        for word, sig in zip(self._strings(self.words, n), self._strings(self.signatures, n)):
+            if sig in index:
+                index[sig].append(word)
+            else:
+                index[sig] = [word]
+        return index
+
+    def close(self):
+        """ Releases the views and closes the underlying mmap, if any """
+        for name in ('offsets', 'scores', 'lengths', 'lengthStart', 'words', 'signatures',
+                     'sigOrder', 'counts', 'wordTable', 'sigTable'):
+            getattr(self, name).release()
+        if isinstance(self.buf, mmap.mmap):
+            self.buf.close()
+
+
+class SnapshotLexicon(Mapping):
+    """
+    Read-only wordList (word -> (score, len)) over a LexiconSnapshot,
+    limited to the words of at most maxLen letters. Lookups search the
+    snapshot in place, so nothing is copied per word.
+    """
+
+    def __init__(self, snapshot, maxLen=None):
+        self.snapshot = snapshot
+        self.maxLen = snapshot.maxLen if maxLen is None else min(maxLen, snapshot.maxLen)
+        self.count = snapshot.end(self.maxLen)
+
+    def __getitem__(self, word):
+        i = self.snapshot.find(word) if isinstance(word, str) and len(word) <= self.maxLen else -1
+        if i < 0:
+            raise KeyError(word)
+        return (self.snapshot.scores[i], self.snapshot.lengths[i])
+
+    def __contains__(self, word):
+        return isinstance(word, str) and len(word) <= self.maxLen and self.snapshot.find(word) >= 0
+
+    def __iter__(self):
+        for i in range(self.count):
+            yield self.snapshot.word(i)
+
+    def __len__(self):
+        return self.count
+
+
+class SnapshotAnagramIndex(Mapping):
+    """
+    Read-only anagram index (signature -> list of words) over a
+    LexiconSnapshot, limited to the words of at most maxLen letters.
+    """
+
+    def __init__(self, snapshot, maxLen=None):
+        self.snapshot = snapshot
+        self.maxLen = snapshot.maxLen if maxLen is None else min(maxLen, snapshot.maxLen)
+
+    def __getitem__(self, sig):
+        words = self.get(sig)
+        if words is None:
+            raise KeyError(sig)
+        return words
+
+    def get(self, sig, default=None):
+        if len(sig) > self.maxLen:
+            return default
+        words = [ self.snapshot.word(i) for i in self.snapshot.anagrams(sig) ]
+        return words or default
+
+    def __iter__(self):
+        # every distinct signature, in sigOrder
+        previous = None
+        for pos in range(self.snapshot.end(self.maxLen)):
+            i = self.snapshot.sigOrder[pos]
+            sig = str(self.snapshot.signatures[self.snapshot.offsets[i]:self.snapshot.offsets[i + 1] - 1], 'ascii')
+            if sig != previous:
+                yield sig
+                previous = sig
+
+    def __len__(self):
+        return sum(1 for sig in self)
+
+
+def snapshotBuckets(snapshot, maxLen=None):
+    """
+    Returns the length buckets (n -> RandomBucket) of the words of at most
+    maxLen letters, as wordgame.getLengthBuckets does for a dict. The words
+    of a length are a range of word numbers of the snapshot (or of a
+    ColumnarLexicon, which has the same lengthStart array and word method).
+    """
+    if maxLen is None:
+        maxLen = snapshot.maxLen
+    return { n: RandomBucket(snapshot.word, range(snapshot.lengthStart[n], snapshot.lengthStart[n + 1]))
+             for n in range(1, min(maxLen, snapshot.maxLen) + 1)
+             if snapshot.lengthStart[n + 1] > snapshot.lengthStart[n] }
+
+
+def openSnapshot(source, path=None):
+    """
+    Returns a LexiconSnapshot for the word list file source, or None if
+    there is no snapshot or it does not match the source file.
+
+    source: string, path of the word list file
+    path: string, defaults to snapshotPath(source)
+    """
+    if path is None:
+        path = snapshotPath(source)
+    try:
+        stat = os.stat(source)
+        with open(path, 'rb') as f:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+    try:
+        snapshot = LexiconSnapshot(buf)
+    except (ValueError, struct.error, TypeError):
+        buf.close()
+        return None
+
+    if snapshot.sourceSize != stat.st_size:
+        valid = False
+    elif snapshot.sourceMtime == stat.st_mtime_ns:
+        valid = True
+    else:
+        valid = snapshot.sourceHash == fileHash(source)
+    if not valid:
+        snapshot.close()
+        return None
+    return snapshot
@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+""" Live word list for the 6.00 Word Game
+
+A LiveLexicon is a wordList (word -> [score, len]) whose words can be
+added, removed or reloaded from a file while games are being played. It
+keeps the structures built from the word list up to date as it changes,
+touching only the words that changed:
+
+    words    dict (word -> [score, len]), the score table
+    buckets  dict (len -> RandomDict (word -> score)), dealHand's pools,
+             as built by wordgame.getLengthBuckets
+    index    dict (signature -> list of words), the anagram index
+
+RandomDict adds and deletes in O(1), so a word leaves or joins its deal
+pool without rebuilding it.
+
+Every change is made under the write side of a readers-writer lock.
+Readers that need more than one lookup to be consistent (a move
+generation, a deal) hold the read side for the duration, see reading(),
+and so never see a change half made. Structures that cannot be updated in
+place (the Dawg, the letter matrix, cached results) are dropped by the
+listeners called after every change.
+"""
+
+from collections.abc import Mapping
+import contextlib
+import threading
+
+from anagram import signature
+from ingest import readWords
+from randomdict import RandomDict
+
+
+class RWLock(object):
+    """
+    Readers-writer lock: any number of readers, or a single writer. Waiting
+    writers go first, so a stream of readers cannot starve them. A thread
+    that already holds the read side may take it again.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+        self._waitingWriters = 0
+        self._local = threading.local()
+
+    @contextlib.contextmanager
+    def reading(self):
+        depth = getattr(self._local, 'depth', 0)
+        if depth == 0:
+            with self._cond:
+                while self._writer or self._waitingWriters:
+                    self._cond.wait()
+                self._readers += 1
+        self._local.depth = depth + 1
+        try:
+            yield
+        finally:
+            self._local.depth = depth
+            if depth == 0:
+                with self._cond:
+                    self._readers -= 1
+                    if self._readers == 0:
+                        self._cond.notify_all()
+
+    @contextlib.contextmanager
+    def writing(self):
+        with self._cond:
+            self._waitingWriters += 1
+            while self._writer or self._readers:
+                self._cond.wait()
+            self._waitingWriters -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer = False
+                self._cond.notify_all()
+
+
+class LiveLexicon(Mapping):
+    """ wordList (word -> [score, len]) that can change while in use """
+
+    def __init__(self, words, score, maxLen=None):
+        """
+        words: dict (string -> [score, len]), the initial word list
+        score: function (word -> int) scoring the words added later
+        maxLen: int, words longer than this are never added (default: no
+        limit)
+        """
+        self.score = score
+        self.maxLen = maxLen
+        self.lock = RWLock()
+        # Bumped by every change that adds or removes a word
+        self.version = 0
+        # Functions called (with the lexicon) after every such change,
+        # while the write lock is still held
+        self.listeners = []
+        self.words = {}
+        self.buckets = {}
+        self.index = {}
+        for word, value in words.items():
+            self._add(word, value)
+
+    def reading(self):
+        """
+        Returns a context manager holding the read side of the lock: the
+        words, buckets and index do not change until it exits.
+        """
+        return self.lock.reading()
+
+    # Mapping interface; iterate while holding reading()
+
+    def __getitem__(self, word):
+        return self.words[word]
+
+    def __contains__(self, word):
+        return word in self.words
+
+    def __iter__(self):
+        return iter(self.words)
+
+    def __len__(self):
+        return len(self.words)
+
+    # Changes
+
+    def _add(self, word, value):
+        self.words[word] = value
+        bucket = self.buckets.get(value[1])
+        if bucket is None:
+            bucket = self.buckets[value[1]] = RandomDict()
+        bucket[word] = value[0]
+        sig = signature(word)
+        if sig in self.index:
+            self.index[sig].append(word)
+        else:
+            self.index[sig] = [word]
+
+    def _remove(self, word):
+        value = self.words.pop(word)
+        bucket = self.buckets[value[1]]
+        del bucket[word]
+        if not bucket:
+            # dealHand reports a missing length, not an empty one
+            del self.buckets[value[1]]
+        sig = signature(word)
+        anagrams = self.index[sig]
+        anagrams.remove(word)
+        if not anagrams:
+            del self.index[sig]
+
+    def _changed(self):
+        self.version += 1
+        for listener in self.listeners:
+            listener(self)
+
+    def addWords(self, words):
+        """
+        Adds the words that are not in the lexicon yet (lowercased, at most
+        maxLen letters long); words with characters other than a-z are
+        skipped, as by readWords.
+
+        words: iterable of strings
+        returns: list of the words added
+        """
+        new = []
+        for word in words:
+            word = word.strip().lower()
+            if word.isascii() and word.isalpha() and (self.maxLen is None or len(word) <= self.maxLen):
+                new.append(word)
+        # Score outside the lock: readers only wait for the updates
+        scored = [ (word, [self.score(word), len(word)]) for word in dict.fromkeys(new) ]
+        added = []
+        with self.lock.writing():
+            for word, value in scored:
+                if word not in self.words:
+                    self._add(word, value)
+                    added.append(word)
+            if added:
+                self._changed()
+        return added
+
+    def removeWords(self, words):
+        """
+        Removes the words that are in the lexicon.
+
+        words: iterable of strings
+        returns: list of the words removed
+        """
+        removed = []
+        with self.lock.writing():
+            for word in words:
+                word = word.strip().lower()
+                if word in self.words:
+                    self._remove(word)
+                    removed.append(word)
+            if removed:
+                self._changed()
+        return removed
+
+    def reloadFromFile(self, paths):
+        """
+        Makes the lexicon hold the words of the word list files in paths
+        (plain, gzip or bz2), changing only the words that differ: the
+        words no longer in the files are removed and the new ones added,
+        in a single change.
+
+        paths: string or list of strings
+        returns: (list of the words added, list of the words removed)
+        """
+        if isinstance(paths, str):
+            paths = [paths]
+        wanted = set(word for word in readWords(paths)
+                     if self.maxLen is None or len(word) <= self.maxLen)
+        with self.lock.reading():
+            current = set(self.words)
+        scored = [ (word, [self.score(word), len(word)]) for word in sorted(wanted - current) ]
+        gone = sorted(current - wanted)
+        added = []
+        removed = []
+        # The diff is made outside the lock, so the write lock is only held
+        # for the changed words; words changed in the meantime by another
+        # writer are left as that writer made them
+        with self.lock.writing():
+            for word, value in scored:
+                if word not in self.words:
+                    self._add(word, value)
+                    added.append(word)
+            for word in gone:
+                if word in self.words:
+                    self._remove(word)
+                    removed.append(word)
+            if added or removed:
+                self._changed()
+        return added, removed
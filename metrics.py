@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+""" Opt-in hot-path instrumentation for the 6.00 Word Game
+
+Records how long each phase of the game takes (loading, index building,
+dealing, move generation, validation, scoring) as latency histograms, and
+counts events such as words examined and candidates accepted. The results
+can be exported as JSON or as a Prometheus text file.
+
+Instrumentation is off unless enable() is called or the WORDGAME_METRICS
+environment variable is set. When it is off, timer() hands out a shared
+no-op context manager, and hot loops check the module-level ENABLED flag
+before recording anything, so the cost is a single attribute lookup.
+
+Usage:
+    with metrics.timer('load'):
+        ...
+    if metrics.ENABLED:
+        metrics.count('words_examined', len(words))
+"""
+
+from bisect import bisect_left
+import json
+import os
+import threading
+import time
+
+ENABLED = bool(os.environ.get('WORDGAME_METRICS'))
+
+# Upper bounds (seconds) of the latency histogram buckets
+BUCKETS = (1e-6, 5e-6, 1e-5, 5e-5, 1e-4, 5e-4, 1e-3, 5e-3, 1e-2, 5e-2, 0.1, 0.5, 1.0, 5.0)
+
+PREFIX = 'wordgame'
+
+_lock = threading.Lock()
+_histograms = {}
+_counters = {}
+
+
+class Histogram(object):
+    """ Latency histogram with fixed buckets, a count and a sum """
+    __slots__ = ('buckets', 'count', 'sum')
+
+    def __init__(self):
+        # one slot per bucket plus one for +Inf
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds):
+        self.buckets[bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def cumulative(self):
+        """ Returns the cumulative bucket counts, Prometheus style """
+        total = 0
+        result = []
+        for n in self.buckets:
+            total += n
+            result.append(total)
+        return result
+
+
+class _NullTimer(object):
+    """ Context manager that does nothing, handed out while disabled """
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class _Timer(object):
+    __slots__ = ('phase', 'start')
+
+    def __init__(self, phase):
+        self.phase = phase
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.phase, time.perf_counter() - self.start)
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def enable(on=True):
+    """ Turns the instrumentation on (or off) """
+    global ENABLED
+    ENABLED = on
+
+
+def reset():
+    """ Drops every recorded timing and count """
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+
+
+def timer(phase):
+    """
+    Returns a context manager that records the time spent in its body as
+    one observation of phase.
+    """
+    if not ENABLED:
+        return _NULL_TIMER
+    return _Timer(phase)
+
+
+def observe(phase, seconds):
+    """ Records one observation of phase that took seconds """
+    if not ENABLED:
+        return
+    with _lock:
+        hist = _histograms.get(phase)
+        if hist is None:
+            hist = _histograms[phase] = Histogram()
+        hist.observe(seconds)
+
+
+def count(name, n=1):
+    """ Adds n to the counter name """
+    if not ENABLED:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+def snapshot():
+    """
+    Returns the recorded metrics as a dict:
+    {'timers': {phase: {'count', 'sum', 'buckets': {le: cumulative}}},
+     'counters': {name: int}}
+    """
+    with _lock:
+        timers = {}
+        for phase, hist in sorted(_histograms.items()):
+            bounds = [ str(b) for b in BUCKETS ] + ['+Inf']
+            timers[phase] = {
+                'count': hist.count,
+                'sum': hist.sum,
+                'buckets': dict(zip(bounds, hist.cumulative())),
+            }
+        return {'timers': timers, 'counters': dict(sorted(_counters.items()))}
+
+
+def exportJSON(path):
+    """ Writes snapshot() to path as JSON """
+    with open(path, 'w') as f:
+        json.dump(snapshot(), f, indent=2)
+
+
+def prometheusText():
+    """ Returns the recorded metrics in the Prometheus text format """
+    data = snapshot()
+    lines = []
+    name = PREFIX + '_phase_seconds'
+    lines.append('# HELP %s Time spent in each phase of the game.' % name)
+    lines.append('# TYPE %s histogram' % name)
+    for phase, timer in data['timers'].items():
+        for le, n in timer['buckets'].items():
+            lines.append('%s_bucket{phase="%s",le="%s"} %d' % (name, phase, le, n))
+        lines.append('%s_sum{phase="%s"} %r' % (name, phase, timer['sum']))
+        lines.append('%s_count{phase="%s"} %d' % (name, phase, timer['count']))
+    for counter, n in data['counters'].items():
+        metric = '%s_%s_total' % (PREFIX, counter)
+        lines.append('# TYPE %s counter' % metric)
+        lines.append('%s %d' % (metric, n))
+    return '\n'.join(lines) + '\n'
+
+
+def exportPrometheus(path):
+    """ Writes prometheusText() to path, e.g. for the node exporter's textfile collector """
+    with open(path + '.tmp', 'w') as f:
+        f.write(prometheusText())
+    os.replace(path + '.tmp', path)
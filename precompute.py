@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+""" Offline precomputation of the solution cache for the 6.00 Word Game
+
+Solves every starting hand dealHand can deal for the given hand sizes (one
+per distinct signature among the words of each length) and stores the
+ranked candidate words and the best sequence of words of each in a
+SolutionCache (see solutioncache.py).
+
+Hands are solved in chunks by a pool of worker processes; the results of
+every chunk are committed as they come in. Running the job again only
+solves the signatures that are not stored yet, so an interrupted run can
+simply be restarted.
+
+Example:
+    python precompute.py --output words.txt.solutions --sizes 4-8 --workers 4
+    python wordgame.py --solutions words.txt.solutions
+"""
+
+import argparse
+import multiprocessing
+import sys
+import time
+
+import wordgame
+from anagram import signature
+from hand import Hand
+from solutioncache import SolutionCache
+
+CHUNK_SIZE = 200
+
+
+def solveChunk(sigs):
+    """
+    Solves the starting hands with the given signatures.
+
+    sigs: list of strings
+    returns: list of (sig, candidates, score, words)
+    """
+    wordList = wordgame.wordList
+    results = []
+    for sig in sigs:
+        hand = Hand(sig)
+        ranked = wordgame.compCandidates(hand, wordList, len(sig))
+        solution = wordgame.compSolveHand(hand, wordList)
+        results.append((sig, ranked, solution.score, solution.words))
+    return results
+
+
+def startingSignatures(wordList, sizes):
+    """ Returns the sorted signatures of the words of wordList whose length is in sizes """
+    buckets = wordgame.getLengthBuckets(wordList)
+    return sorted(set(signature(word) for n in sizes for word in buckets.get(n, ())))
+
+
+def parseSizes(text):
+    """ Parses '4-8' or '4,5,7' into a list of hand sizes """
+    sizes = []
+    for part in text.split(','):
+        low, sep, high = part.partition('-')
+        sizes.extend(range(int(low), int(high or low) + 1))
+    return sizes
+
+
+def run(output, sizes, workers=None, chunkSize=CHUNK_SIZE, log=None):
+    """
+    Solves the starting hands of the given sizes not stored in the cache at
+    output yet, and stores them.
+
+    returns: int, number of hands solved in this run
+    """
+    if log is None:
+        log = sys.stderr
+    source = wordgame.WORDLIST_FILENAME
+    wordList = wordgame.loadWords(wordgame.MAX_HAND_SIZE, verbose=False)
+    with SolutionCache(output, source, create=True) as cache:
+        todo = sorted(set(startingSignatures(wordList, sizes)) - cache.signatures())
+        print(len(todo), "starting hands to solve", file=log)
+        chunks = [ todo[i:i + chunkSize] for i in range(0, len(todo), chunkSize) ]
+        solved = 0
+        start = time.perf_counter()
+        if workers == 0:
+            wordgame.loadWorkerWords()
+            results = map(solveChunk, chunks)
+        else:
+            pool = multiprocessing.Pool(workers, initializer=wordgame.loadWorkerWords)
+            results = pool.imap_unordered(solveChunk, chunks)
+        try:
+            for chunk in results:
+                cache.put(chunk)
+                solved += len(chunk)
+                elapsed = time.perf_counter() - start
+                print("   {:,} / {:,} hands ({:,.0f} hands/s)".format(
+                    solved, len(todo), solved / elapsed if elapsed else 0.0), file=log)
+        finally:
+            if workers != 0:
+                pool.terminate()
+        if solved:
+            cache.compact()
+        print("Solved {:,} hands in {:.2f}s; {:,} hands stored in {}".format(
+            solved, time.perf_counter() - start, len(cache), output), file=log)
+    return solved
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Precompute the solution cache of the 6.00 Word Game")
+    parser.add_argument('--output', default=wordgame.WORDLIST_FILENAME + '.solutions',
+                        help="SQLite database to fill (default: %(default)s)")
+    parser.add_argument('--sizes', default='4-8', help="hand sizes to solve (default: %(default)s)")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="worker processes (default: one per CPU, 0: no pool)")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help="hands per chunk")
+    args = parser.parse_args(argv)
+    run(args.output, parseSizes(args.sizes), args.workers, args.chunk_size)
+
+
+if __name__ == '__main__':
+    main()
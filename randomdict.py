@@ -1,14 +1,30 @@
 # -*- coding: utf-8 -*-
 """ Random Dict. Retrieved from https://github.com/robtandy/randomdict/blob/master/randomdict.py on 10/6/2016
     Credit: Rob Tandy
+
+    Reworked for the word game: keys, values and weights are kept in parallel
+    arrays, overwriting a key no longer grows the arrays, and keys can be
+    drawn in batches or in proportion to a per-key weight. RandomBucket
+    draws keys the same way from a sequence of key numbers.
+
+    The weights themselves are updated in O(1), but the alias table of the
+    weighted draws is not: any insert, delete or weight change marks it out
+    of date, and the next weighted draw rebuilds it in O(n). Weighted draws
+    suit a dict that changes rarely between draws; a dict updated between
+    every draw (e.g. the buckets of a LiveLexicon being edited) pays O(n)
+    per draw. Unweighted draws are O(1) whatever the changes.
 """
 
-from collections import MutableMapping
+from array import array
+from collections.abc import MutableMapping
 import random
+import sys
 
-__version__ = '0.2.0'
+__version__ = '0.3.0'
 
 class RandomDict(MutableMapping):
+    __slots__ = ('_index', '_keys', '_values', '_weights', '_total', '_prob', '_alias')
+
     def __init__(self, *args, **kwargs):
         """ Create RandomDict object with contents specified by arguments.
         Any argument
@@ -16,69 +32,217 @@ class RandomDict(MutableMapping):
         :param **kwargs:    key, value pairs will be added to this dict
         """
         # mapping of keys to array positions
-        self.keys = {}
-        self.values = []
-        self.last_index = -1
+        self._index = {}
+        # parallel arrays: the item at position i is
+        # (_keys[i], _values[i]) and is drawn with weight _weights[i]
+        self._keys = []
+        self._values = []
+        self._weights = array('d')
+        self._total = 0.0
+        # alias table for weighted draws, rebuilt lazily after the weights
+        # change (None when out of date)
+        self._prob = None
+        self._alias = None
 
         self.update(*args, **kwargs)
 
     def __setitem__(self, key, val):
-        if key in self.keys:
-            i = self.keys[key]
+        i = self._index.get(key)
+        if i is None:
+            self.add(key, val)
         else:
-            self.last_index += 1
-            i = self.last_index
+            # overwrite in place, the item keeps its weight
+            self._values[i] = val
 
-        self.values.append((key, val))
-        self.keys[key] = i
-    
-    def __delitem__(self, key):
-        if not key in self.keys:
-            raise KeyError
+    def add(self, key, val, weight=1.0):
+        """ Set key to val and give it the given weight for weighted draws,
+        in O(1) time (the next weighted draw then rebuilds the alias table
+        in O(n)).
 
+        :param weight:      non-negative number
+        """
+        if weight < 0:
+            raise ValueError("weight must be non-negative")
+        i = self._index.get(key)
+        if i is None:
+            self._index[key] = len(self._keys)
+            self._keys.append(key)
+            self._values.append(val)
+            self._weights.append(weight)
+            self._total += weight
+        else:
+            self._values[i] = val
+            self._total += weight - self._weights[i]
+            self._weights[i] = weight
+        self._prob = None
+
+    def __delitem__(self, key):
         # index of item to delete is i
-        i = self.keys[key]
-        # last item in values array is
-        move_key, move_val = self.values.pop()
+        i = self._index.pop(key)
+        last = len(self._keys) - 1
+        self._total -= self._weights[i]
 
-        if i != self.last_index:
+        if i != last:
             # we move the last item into its location
-            self.values[i] = (move_key, move_val)
-            self.keys[move_key] = i
+            move_key = self._keys[last]
+            self._keys[i] = move_key
+            self._values[i] = self._values[last]
+            self._weights[i] = self._weights[last]
+            self._index[move_key] = i
         # else it was the last item and we just throw
         # it away
 
-        # shorten array of values
-        self.last_index -= 1
-        # remove deleted key
-        del self.keys[key]
-    
+        # shorten the arrays
+        self._keys.pop()
+        self._values.pop()
+        self._weights.pop()
+        self._prob = None
+
     def __getitem__(self, key):
-        if not key in self.keys:
-            raise KeyError
+        return self._values[self._index[key]]
 
-        i = self.keys[key]
-        return self.values[i][1]
+    def __contains__(self, key):
+        return key in self._index
 
     def __iter__(self):
-        return iter(self.keys)
+        return iter(self._index)
 
     def __len__(self):
-        return self.last_index + 1
+        return len(self._keys)
 
-    def random_key(self):
-        """ Return a random key from this dictionary in O(1) time """
-        if len(self) == 0:
+    @property
+    def last_index(self):
+        """ Position of the last item in the arrays (-1 when empty) """
+        return len(self._keys) - 1
+
+    def weight(self, key):
+        """ Return the weight of key """
+        return self._weights[self._index[key]]
+
+    def set_weight(self, key, weight):
+        """ Change the weight of an existing key in O(1) time (see add) """
+        self.add(key, self[key], weight)
+
+    def total_weight(self):
+        """ Return the sum of all the weights """
+        return self._total
+
+    def _build_alias(self):
+        """ Build the alias table (Vose's method) for the current weights in
+        O(n) time.
+        """
+        n = len(self._weights)
+        # recompute the total to drop any rounding drift from the
+        # incremental updates
+        self._total = total = sum(self._weights)
+        if total <= 0:
+            raise ValueError("RandomDict has no positive weights")
+        scaled = [w * n / total for w in self._weights]
+        prob = array('d', [1.0]) * n
+        alias = array('l', range(n))
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            s = small.pop()
+            l = large.pop()
+            prob[s] = scaled[s]
+            alias[s] = l
+            scaled[l] = scaled[l] + scaled[s] - 1.0
+            if scaled[l] < 1.0:
+                small.append(l)
+            else:
+                large.append(l)
+        # whatever is left over has probability 1 (up to rounding)
+        self._prob = prob
+        self._alias = alias
+
+    def _random_index(self, rng, weighted):
+        if len(self._keys) == 0:
             raise KeyError("RandomDict is empty")
-        
-        i = random.randint(0, self.last_index)
-        return self.values[i][0]
+        if not weighted:
+            return int(rng.random() * len(self._keys))
+        if self._prob is None:
+            self._build_alias()
+        i = int(rng.random() * len(self._keys))
+        if rng.random() < self._prob[i]:
+            return i
+        return self._alias[i]
+
+    def random_key(self, rng=None, weighted=False):
+        """ Return a random key from this dictionary in O(1) time
+
+        :param rng:         random.Random instance to draw from (defaults to
+                            the random module)
+        :param weighted:    if True, keys are drawn in proportion to their
+                            weight (O(1) after an O(n) alias table rebuild
+                            following any insert, delete or change of the
+                            weights)
+        """
+        return self._keys[self._random_index(rng or random, weighted)]
 
-    def random_value(self):
+    def random_value(self, rng=None, weighted=False):
         """ Return a random value from this dictionary in O(1) time """
-        return self[self.random_key()]
+        return self._values[self._random_index(rng or random, weighted)]
 
-    def random_item(self):
+    def random_item(self, rng=None, weighted=False):
         """ Return a random key-value pair from this dictionary in O(1) time """
-        k = self.random_key()
-        return k, self[k]
\ No newline at end of file
+        i = self._random_index(rng or random, weighted)
+        return self._keys[i], self._values[i]
+
+    def sample(self, k, rng=None, weighted=False):
+        """ Return a list of k random keys, drawn with replacement, in O(k)
+        time
+
+        :param rng:         random.Random instance to draw from (defaults to
+                            the random module)
+        :param weighted:    if True, keys are drawn in proportion to their
+                            weight (see random_key)
+
+        Unweighted keys are drawn as k calls to random_key would draw them.
+        """
+        rng = rng or random
+        if len(self._keys) == 0:
+            raise KeyError("RandomDict is empty")
+        if not weighted:
+            return rng.choices(self._keys, k=k)
+        return [ self._keys[self._random_index(rng, True)] for i in range(k) ]
+
+
+class RandomBucket(object):
+    """ Read-only group of keys stored elsewhere and looked up by number,
+    with the random_key method of RandomDict (e.g. the words of one length
+    in a lexicon snapshot or a Dawg).
+    """
+    __slots__ = ('_key', '_numbers')
+
+    def __init__(self, key, numbers):
+        """
+        :param key:         function returning the key numbered i
+        :param numbers:     sequence of the numbers of the keys (e.g. an
+                            array or a range)
+        """
+        self._key = key
+        self._numbers = numbers
+
+    def __len__(self):
+        return len(self._numbers)
+
+    def random_key(self, rng=None):
+        """ Return a random key in O(1) time, drawn as RandomDict.random_key
+        does, so that a seeded rng draws the same keys from both
+        """
+        if len(self._numbers) == 0:
+            raise KeyError("RandomBucket is empty")
+        return self._key(self._numbers[int((rng or random).random() * len(self._numbers))])
+
+    def sample(self, k, rng=None):
+        """ Return a list of k random keys, drawn with replacement as k
+        calls to random_key would draw them, in O(k) time
+        """
+        if len(self._numbers) == 0:
+            raise KeyError("RandomBucket is empty")
+        return [ self._key(i) for i in (rng or random).choices(self._numbers, k=k) ]
+
+    def nbytes(self):
+        """ Return the bytes used by the bucket and its numbers """
+        return sys.getsizeof(self) + sys.getsizeof(self._numbers)
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+""" Persistent process pool for full word list scans
+
+A scan checks every word of the word list against the hand, which is
+CPU-bound pure Python: threads cannot run it in parallel. ScanPool keeps a
+pool of worker processes for the whole session. The lexicon is handed to
+the workers once, when the pool starts (as a ColumnarLexicon, inherited
+when the workers are forked), and every scan only sends the hand.
+
+A scan splits the words that fit in the hand into a few contiguous ranges
+per worker. Each worker scans its range over the columnar arrays (see
+ColumnarLexicon.playable) and returns its best k words; the partial
+results are merged into the best k overall.
+
+Usage:
+    with ScanPool(ColumnarLexicon.fromWordList(wordList), workers=4) as pool:
+        ranked = pool.candidates(hand, n, k=10)
+"""
+
+import heapq
+import multiprocessing
+import os
+
+from anagram import BONUS, rankKey
+
+# Ranges each scan is split into, per worker: more than one evens out the
+# ranges whose words pass the letter-mask filter more often
+CHUNKS_PER_WORKER = 4
+
+# The lexicon of a worker process, set by _initWorker
+_lexicon = None
+
+
+def _initWorker(lexicon):
+    global _lexicon
+    _lexicon = lexicon
+
+
+def rankChunk(lexicon, hand, n, start, stop, k=None):
+    """
+    Returns the best k words numbered from start to stop that can be made
+    from the hand, as (score, word) pairs best first (ties in alphabetical
+    order).
+
+    lexicon: ColumnarLexicon
+    hand: dictionary (string -> int)
+    n: int, hand size for the bonus of getWordScore
+    k: int, number of words to keep (default: all of them)
+    """
+    scores, lengths = lexicon.scores, lexicon.lengths
+    ranked = [ (scores[i] + (BONUS if lengths[i] == n else 0), lexicon.word(i))
+               for i in lexicon.playable(hand, n, start, stop) ]
+    if k is None:
+        return sorted(ranked, key=rankKey)
+    return heapq.nsmallest(k, ranked, key=rankKey)
+
+
+def _scanChunk(spec):
+    hand, n, start, stop, k = spec
+    return rankChunk(_lexicon, hand, n, start, stop, k)
+
+
+class ScanPool(object):
+    """ Worker processes scanning one lexicon, reused across scans """
+
+    def __init__(self, lexicon, workers=None):
+        """
+        lexicon: ColumnarLexicon, the words to scan
+        workers: int, number of worker processes (default: one per CPU)
+        """
+        self.lexicon = lexicon
+        self.workers = workers or os.cpu_count() or 1
+        self.pool = multiprocessing.Pool(self.workers, initializer=_initWorker, initargs=(lexicon,))
+
+    def chunks(self, n):
+        """ Returns the (start, stop) ranges of a scan for words of at most n letters """
+        lexicon = self.lexicon
+        end = lexicon.lengthStart[min(n, lexicon.maxLen) + 1]
+        count = self.workers * CHUNKS_PER_WORKER
+        size = max(1, -(-end // count))
+        return [ (start, min(start + size, end)) for start in range(0, end, size) ]
+
+    def candidates(self, hand, n, k=None):
+        """
+        Returns the words that can be made from the hand as (score, word)
+        pairs, best first (ties in alphabetical order), keeping the best k.
+
+        hand: dictionary (string -> int)
+        n: int, hand size for the bonus of getWordScore
+        k: int, number of words to return (default: all of them)
+        returns: list of (int, string)
+        """
+        hand = dict(hand.items())
+        total = sum(hand.values())
+        specs = [ (hand, n, start, stop, k) for start, stop in self.chunks(total) ]
+        parts = self.pool.map(_scanChunk, specs, chunksize=1)
+        merged = heapq.merge(*parts, key=rankKey)
+        if k is None:
+            return list(merged)
+        return [ sw for sw, i in zip(merged, range(k)) ]
+
+    def close(self):
+        """ Stops the worker processes """
+        self.pool.terminate()
+        self.pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,390 @@
+# -*- coding: utf-8 -*-
+""" Asyncio game server for the 6.00 Word Game
+
+Hosts many concurrent game sessions over TCP in a single process. All the
+sessions share one word list and its indexes, loaded once at startup.
+Computer turns are played in a process pool so that they never stall the
+event loop; each worker process loads the word list once.
+
+The word list is a LiveLexicon (see livelex.py): on SIGHUP the server
+reloads the word list file, adding and removing only the words that
+changed, and moves the computer's turns to a fresh pool that loads the new
+words. Sessions in progress are kept.
+
+Protocol: plain text lines, mirroring playGame and playHand. The server
+sends output lines as they are, and every line that waits for an answer
+starts with PROMPT ('? '). The client answers each prompt with one line:
+
+    ? How many letters would you like to be dealt? (4-8):   -> 4 .. 8
+    ? Enter 'n' to deal a new hand, 'r' to replay ...:      -> n, r or x
+    ? Enter 'u' to have yourself play, 'c' to have ...:      -> u or c
+    ? Enter word, a 'r' to shuffle the letters, ...:         -> a word, r, ?prefix or .
+
+Example:
+    python server.py --port 6000 --workers 4
+    python server.py --selftest 200      # 200 scripted local clients
+"""
+
+import argparse
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+import contextlib
+import multiprocessing
+import os
+import random
+import signal
+import time
+
+from ingest import ingest
+import lexcache
+import wordgame
+
+PROMPT = '? '
+
+
+def _initWorker():
+    """ Loads the word list in an executor process, without any output """
+    wordgame.loadWorkerWords()
+
+
+def computerPlay(hand, strategy='greedy'):
+    """
+    Plays the hand for the computer (in an executor process) and returns
+    the turns as a list of (word, score, hand left).
+
+    hand: dictionary (string -> int)
+    strategy: string (one of wordgame.STRATEGIES), see compPlayHand
+    """
+    return list(wordgame.compPlayTurns(hand, wordgame.wordList, strategy))
+
+
+def handText(hand):
+    """ Returns the letters of the hand as displayHand prints them """
+    return ' '.join(ltr for ltr in hand for i in range(hand[ltr]))
+
+
+class SessionClosed(Exception):
+    """ Raised when the client of a session disconnects """
+
+
+class GameSession(object):
+    """ One player's game, driven by the lines read from its connection """
+
+    def __init__(self, server, reader, writer):
+        self.server = server
+        self.reader = reader
+        self.writer = writer
+        self.rng = random.Random()
+
+    async def send(self, *lines):
+        self.writer.write(''.join(line + '\n' for line in lines).encode())
+        await self.writer.drain()
+
+    async def ask(self, question):
+        """ Sends a prompt and returns the client's answer """
+        await self.send(PROMPT + question)
+        line = await self.reader.readline()
+        if not line:
+            raise SessionClosed()
+        return line.decode(errors='replace').strip()
+
+    async def run(self):
+        await self.send("Welcome to the MIT 6.00.1x Wordgame (etherwar's mod)")
+        handSize = await self.askHandSize()
+        hand = None
+        while True:
+            userInput = await self.ask("Enter 'n' to deal a new hand, 'r' to replay the last hand, or 'x' to end game: ")
+            if userInput == 'n':
+                hand = wordgame.dealHand(self.server.wordList, handSize, self.rng)
+                await self.playOnce(hand, handSize)
+            elif userInput == 'r':
+                if hand is not None:
+                    await self.playOnce(hand, handSize)
+                else:
+                    await self.send("You have not played a hand yet. Please play a new hand first!")
+            elif userInput == 'x':
+                await self.send("Goodbye!")
+                break
+            else:
+                await self.send("Invalid Command.")
+
+    async def askHandSize(self):
+        """ Mirrors welcome(): asks for a hand size from 4 to 8 """
+        while True:
+            answer = await self.ask("How many letters would you like to be dealt? (4-8): ")
+            try:
+                handSize = int(answer)
+            except ValueError:
+                await self.send("Invalid input. Default hand size selected (6).")
+                return 6
+            if 4 <= handSize <= wordgame.MAX_HAND_SIZE:
+                return handSize
+            await self.send("Invalid number. Please select a number from 4 to 8.")
+
+    async def playOnce(self, hand, handSize):
+        while True:
+            userInputSub = await self.ask("Enter 'u' to have yourself play, 'c' to have the computer play: ")
+            if userInputSub == 'u':
+                await self.playHand(hand, handSize)
+                return
+            elif userInputSub == 'c':
+                await self.compPlayHand(hand)
+                return
+            await self.send("Invalid Command")
+
+    async def playHand(self, hand, n):
+        """ Mirrors playHand """
+        wordList = self.server.wordList
+        score = 0
+        while wordgame.calculateHandlen(hand) > 0:
+            await self.send("Current hand: " + handText(hand))
+            userSelect = await self.ask("Enter word, a 'r' to shuffle the letters, a '?' and the start of a word for hints, or a '.' to indicate that you are finished: ")
+            if userSelect == '.':
+                break
+            elif userSelect.startswith('?'):
+                await self.send(*wordgame.getHints(hand, wordList, userSelect[1:], wordgame.calculateHandlen(hand)))
+            elif userSelect == 'r':
+                letters = handText(hand).split()
+                self.rng.shuffle(letters)
+                await self.send("Shuffled hand: " + ' '.join(letters))
+            else:
+                # A reload must not change the word list between validating
+                # and scoring the word; the lock is released before sending
+                with wordgame.reading(wordList):
+                    valid = wordgame.isValidWord(userSelect, hand, wordList)
+                    if valid:
+                        wordScore = wordgame.getWordScore(userSelect, wordgame.calculateHandlen(hand))
+                        hand = wordgame.updateHand(hand, userSelect)
+                if not valid:
+                    await self.send("Invalid word, please try again.")
+                    continue
+                score += wordScore
+                await self.send("Congratulations, your word '" + userSelect + "' has earned you " +
+                                str(wordScore) + " points. Your new score is: " + str(score) + ".")
+        await self.send("Game over. You scored " + str(score) + " points.")
+
+    async def compPlayHand(self, hand):
+        """ Mirrors compPlayHand, with the computer's turns played in the executor """
+        loop = asyncio.get_running_loop()
+        turns = await loop.run_in_executor(self.server.executor, computerPlay, hand, self.server.strategy)
+        lines = ["Current Hand: " + handText(hand)]
+        total = 0
+        for word, score, left in turns:
+            total += score
+            lines.append('"' + word + '" earned ' + str(score) + ' points. Total: ' + str(total) + ' points')
+            if wordgame.calculateHandlen(left) > 0:
+                lines.append("Current Hand: " + handText(left))
+            hand = left
+        lines.append("I give up!" if wordgame.calculateHandlen(hand) > 0 else "Game over!")
+        lines.append('Total score: ' + str(total) + ' points.')
+        await self.send(*lines)
+
+
+class GameServer(object):
+    """ TCP server hosting GameSessions that share one word list """
+
+    def __init__(self, wordList, executor, strategy='greedy'):
+        """
+        wordList: dict (string -> list), loaded with wordgame.loadWords
+        executor: concurrent.futures executor for the computer's turns; its
+        workers must have the word list loaded (see _initWorker)
+        strategy: string (one of wordgame.STRATEGIES), see compPlayHand
+        """
+        self.wordList = wordList
+        self.executor = executor
+        self.strategy = strategy
+        self.sessions = 0
+        self.server = None
+
+    async def handle(self, reader, writer):
+        self.sessions += 1
+        try:
+            await GameSession(self, reader, writer).run()
+        except (SessionClosed, ConnectionError):
+            pass
+        finally:
+            self.sessions -= 1
+            writer.close()
+            with contextlib.suppress(ConnectionError):
+                await writer.wait_closed()
+
+    async def start(self, host='127.0.0.1', port=0):
+        """ Starts listening and returns the (host, port) bound """
+        self.server = await asyncio.start_server(self.handle, host, port, backlog=1024)
+        return self.server.sockets[0].getsockname()[:2]
+
+    async def close(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def reload(self, executor, paths=None):
+        """
+        Reloads the word list from its files without dropping any session,
+        see LiveLexicon.reloadFromFile, and returns (added, removed).
+
+        executor: executor for the computer's turns from now on, whose
+        workers load the reloaded word list; the current one finishes the
+        turns it was given and shuts down
+        paths: list of word list files (default: [WORDLIST_FILENAME]); the
+        executor's workers load WORDLIST_FILENAME (see _initWorker)
+        """
+        if paths is None:
+            paths = [wordgame.WORDLIST_FILENAME]
+        loop = asyncio.get_running_loop()
+        added, removed = await loop.run_in_executor(None, self.wordList.reloadFromFile, paths)
+        if added or removed:
+            await loop.run_in_executor(None, self.rebuild, paths)
+        old, self.executor = self.executor, executor
+        old.shutdown(wait=False)
+        return added, removed
+
+    def rebuild(self, paths):
+        """
+        Rebuilds what the word list change dropped, off the event loop: the
+        Dawg for hints and the lexicon snapshot the new workers load (one
+        rebuild here rather than one in every worker).
+
+        Only the in-process lexicon is updated in place: this step, and the
+        new workers loading the snapshot, cost a full pass over the word
+        list however few words changed.
+        """
+        with wordgame.reading(self.wordList):
+            wordgame.getDawg(self.wordList)
+        if len(paths) == 1:
+            snapshot = lexcache.openSnapshot(paths[0])
+            if snapshot is not None:
+                snapshot.close()
+            else:
+                words = ingest(paths, wordgame.getWordScore_init)
+                lexcache.writeSnapshot(paths[0], list(words), [ v[0] for v in words.values() ])
+
+
+class Client(object):
+    """ Local client harness: connects to a server and answers its prompts """
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.transcript = []
+
+    @classmethod
+    async def connect(cls, host, port):
+        reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer)
+
+    async def prompt(self):
+        """
+        Reads output lines up to the next prompt and returns the prompt's
+        question, or None if the server closed the connection.
+        """
+        while True:
+            line = await self.reader.readline()
+            if not line:
+                return None
+            line = line.decode().rstrip('\n')
+            self.transcript.append(line)
+            if line.startswith(PROMPT):
+                return line[len(PROMPT):]
+
+    async def answer(self, text):
+        self.transcript.append('> ' + text)
+        self.writer.write((text + '\n').encode())
+        await self.writer.drain()
+
+    async def play(self, answers):
+        """
+        Answers successive prompts with answers until they run out or the
+        server closes the connection; returns the transcript.
+        """
+        for text in answers:
+            if await self.prompt() is None:
+                break
+            await self.answer(text)
+        # read whatever the server still sends before it closes
+        await self.prompt()
+        await self.close()
+        return self.transcript
+
+    async def close(self):
+        self.writer.close()
+        with contextlib.suppress(ConnectionError):
+            await self.writer.wait_closed()
+
+
+def makeExecutor(workers):
+    """
+    Returns a process pool whose workers have the word list loaded.
+
+    The workers are spawned rather than forked: the pool starts workers on
+    demand, and a forked worker would inherit the sockets of the sessions
+    open at the time, keeping them from closing.
+    """
+    return ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'),
+                               initializer=_initWorker)
+
+
+async def selftest(server, clients):
+    """
+    Runs the given number of scripted clients concurrently against a running
+    server and returns (transcripts, seconds).
+    """
+    host, port = server.server.sockets[0].getsockname()[:2]
+    script = ['7', 'n', 'c', 'r', 'u', '?', 'zzz', '.', 'n', 'c', 'x']
+
+    async def one():
+        client = await Client.connect(host, port)
+        return await client.play(script)
+
+    start = time.perf_counter()
+    transcripts = await asyncio.gather(*(one() for i in range(clients)))
+    return transcripts, time.perf_counter() - start
+
+
+async def serve(args):
+    print("Loading word list for all sessions...")
+    wordList = wordgame.loadWords(wordgame.MAX_HAND_SIZE, live=True)
+    # Build the Dawg for hints now rather than on the first hint
+    wordgame.getDawg(wordList)
+    server = GameServer(wordList, makeExecutor(args.workers), args.strategy)
+    try:
+        host, port = await server.start(args.host, args.port)
+        if args.selftest:
+            transcripts, seconds = await selftest(server, args.selftest)
+            finished = sum(1 for t in transcripts if t and t[-1] == 'Goodbye!')
+            print(finished, "of", len(transcripts), "sessions finished in", round(seconds, 2), "s")
+            await server.close()
+            return
+        print("Serving on", host, "port", port)
+        loop = asyncio.get_running_loop()
+        with contextlib.suppress(AttributeError, NotImplementedError):
+            loop.add_signal_handler(signal.SIGHUP, lambda: asyncio.ensure_future(reload(server, args)))
+        async with server.server:
+            await server.server.serve_forever()
+    finally:
+        server.executor.shutdown()
+
+
+async def reload(server, args):
+    """ SIGHUP handler: reloads the word list and reports the change """
+    added, removed = await server.reload(makeExecutor(args.workers))
+    print("Reloaded word list:", len(added), "words added,", len(removed), "removed,",
+          len(server.wordList), "words")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Asyncio server for the 6.00 Word Game")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=6000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                        help="processes playing the computer's turns (default: one per CPU)")
+    parser.add_argument('--strategy', choices=wordgame.STRATEGIES, default='greedy')
+    parser.add_argument('--selftest', type=int, metavar='CLIENTS', default=0,
+                        help="run CLIENTS scripted local clients against an ephemeral server and exit")
+    args = parser.parse_args(argv)
+    if args.selftest:
+        args.port = 0
+    asyncio.run(serve(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+""" Shared-memory lexicon for multi-process workers
+
+Every worker process that runs loadWords keeps a private copy of the word
+list dict and its indexes, so memory grows with the number of workers.
+SharedLexicon publishes the lexicon once into a multiprocessing
+shared_memory segment, in the snapshot layout of lexcache.py (words,
+scores, lengths, signatures and letter counts). Workers attach to the
+segment by name and use it in place through the snapshot views, without
+copying it. Lookups in the segment go through its hash tables rather than
+a dict, so they trade some speed for memory.
+
+Lifecycle:
+    lexicon = SharedLexicon.create(wordList)     # parent, once
+    ...start workers, passing lexicon.name...
+    worker = SharedLexicon.attach(name)          # in each worker
+    worker.install(handSize)                     # wordgame now uses it
+    worker.close()                               # worker, when done
+    lexicon.close(); lexicon.unlink()            # parent, when all are done
+
+SharedLexicon is also a context manager: leaving the with block closes it,
+and unlinks the segment if this process created it.
+
+python sharedlex.py --check 1,2,4,8 measures the private memory of workers
+using the shared lexicon against workers that load their own copy.
+"""
+
+import argparse
+import contextlib
+import io
+import multiprocessing
+from multiprocessing import resource_tracker, shared_memory
+import random
+import resource
+
+import wordgame
+from lexcache import (LexiconSnapshot, SnapshotAnagramIndex, SnapshotLexicon,
+                      packSnapshot, snapshotBuckets)
+
+
+class SharedLexicon(object):
+    """ A lexicon snapshot held in a named shared memory segment """
+
+    def __init__(self, shm, owner):
+        self.shm = shm
+        self.owner = owner
+        self.snapshot = LexiconSnapshot(shm.buf)
+
+    @property
+    def name(self):
+        """ Name of the segment, passed to attach() in the workers """
+        return self.shm.name
+
+    @property
+    def size(self):
+        return self.shm.size
+
+    @classmethod
+    def create(cls, wordList, name=None):
+        """
+        Publishes wordList (word -> [score, len]) into a new shared memory
+        segment and returns the owning SharedLexicon.
+
+        name: string, name of the segment (a unique name is chosen if omitted)
+        """
+        words = list(wordList)
+        data = packSnapshot(words, [ wordList[w][0] for w in words ])
+        shm = shared_memory.SharedMemory(name=name, create=True, size=len(data))
+        shm.buf[:len(data)] = data
+        return cls(shm, True)
+
+    @classmethod
+    def attach(cls, name):
+        """
+        Attaches to the segment published under name and returns a
+        non-owning SharedLexicon.
+        """
+        try:
+            shm = shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:
+            # Before Python 3.13 attaching registers the segment with the
+            # resource tracker. Worker processes share their parent's
+            # tracker, where the registration is harmless, but a process
+            # with a tracker of its own would have the segment unlinked when
+            # it exits, while other processes still use it
+            inherited = getattr(resource_tracker._resource_tracker, '_fd', None) is not None
+            shm = shared_memory.SharedMemory(name=name)
+            if not inherited:
+                resource_tracker.unregister(shm._name, 'shared_memory')
+        return cls(shm, False)
+
+    def wordList(self, maxLen=None):
+        """ Returns a read-only wordList view of the words of at most maxLen letters """
+        return SnapshotLexicon(self.snapshot, maxLen)
+
+    def install(self, maxLen=None):
+        """
+        Makes wordgame use the shared lexicon: sets its wordList, anagram
+        index and length buckets to views of the segment. Returns the
+        wordList view.
+        """
+        wordList = self.wordList(maxLen)
+        wordgame.wordList = wordList
+        wordgame.anagramIndex = SnapshotAnagramIndex(self.snapshot, maxLen)
+        wordgame.anagramIndexSource = wordList
+        wordgame.lengthBuckets = snapshotBuckets(self.snapshot, maxLen)
+        wordgame.lengthBucketsSource = wordList
+        wordgame.candidateCache.clear()
+        return wordList
+
+    def close(self):
+        """ Detaches this process from the segment """
+        if self.snapshot is not None:
+            self.snapshot.close()
+            self.snapshot = None
+            self.shm.close()
+
+    def unlink(self):
+        """ Destroys the segment; only the owner may do this """
+        if not self.owner:
+            raise ValueError("only the process that created the segment may unlink it")
+        self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        if self.owner:
+            self.unlink()
+        return False
+
+
+def memoryUsage():
+    """
+    Returns (private kB, RSS kB) of this process. Private memory counts only
+    the pages not shared with another process; on systems without
+    /proc/self/smaps_rollup it falls back to the peak RSS.
+    """
+    private = rss = None
+    try:
+        with open('/proc/self/smaps_rollup') as f:
+            fields = dict(line.split(':', 1) for line in f if ':' in line)
+        private = sum(int(fields[k].split()[0]) for k in ('Private_Clean', 'Private_Dirty'))
+        rss = int(fields['Rss'].split()[0])
+    except (OSError, KeyError, ValueError):
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        private = rss
+    return private, rss
+
+
+def _measureWorker(mode, name, handSize, hands, results):
+    """ Loads or attaches the lexicon, plays some hands and reports its memory """
+    lexicon = None
+    with contextlib.redirect_stdout(io.StringIO()):
+        if mode == 'shared':
+            lexicon = SharedLexicon.attach(name)
+            wordList = lexicon.install(handSize)
+        else:
+            wordList = wordgame.loadWords(handSize)
+    rng = random.Random(hands)
+    for hand in wordgame.dealHands(hands, handSize, wordList, rng):
+        wordgame.compChooseWord(hand, wordList, handSize, rng=rng)
+    results.put(memoryUsage())
+    if lexicon is not None:
+        lexicon.close()
+
+
+def checkWorkerMemory(workerCounts, handSize=7, hands=50):
+    """
+    Starts 'private' workers (each runs loadWords) and 'shared' workers
+    (each attaches to one SharedLexicon) for every count in workerCounts
+    and returns a list of (mode, workers, mean private kB, mean RSS kB).
+    """
+    ctx = multiprocessing.get_context('spawn')
+    with contextlib.redirect_stdout(io.StringIO()):
+        wordList = wordgame.loadWords(handSize)
+    rows = []
+    with SharedLexicon.create(wordList) as lexicon:
+        for mode in ('private', 'shared'):
+            for count in workerCounts:
+                results = ctx.Queue()
+                procs = [ ctx.Process(target=_measureWorker, args=(mode, lexicon.name, handSize, hands, results))
+                          for i in range(count) ]
+                for p in procs:
+                    p.start()
+                usage = [ results.get() for p in procs ]
+                for p in procs:
+                    p.join()
+                rows.append((mode, count, sum(u[0] for u in usage) / count, sum(u[1] for u in usage) / count))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Shared-memory lexicon for multi-process workers")
+    parser.add_argument('--check', default='1,2,4,8', metavar='COUNTS',
+                        help="comma separated worker counts to measure (default: %(default)s)")
+    parser.add_argument('--hand-size', type=int, default=wordgame.HAND_SIZE)
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="allowed growth of per-worker private memory (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    counts = [ int(c) for c in args.check.split(',') ]
+    rows = checkWorkerMemory(counts, args.hand_size)
+    print("{:<8} {:>7} {:>16} {:>12}".format('mode', 'workers', 'private/worker', 'rss/worker'))
+    for mode, count, private, rss in rows:
+        print("{:<8} {:>7} {:>13,.0f} kB {:>9,.0f} kB".format(mode, count, private, rss))
+
+    shared = [ private for mode, count, private, rss in rows if mode == 'shared' ]
+    flat = max(shared) <= min(shared) * (1 + args.tolerance)
+    print("Per-worker private memory with the shared lexicon is",
+          "flat" if flat else "NOT flat", "across worker counts")
+    return 0 if flat else 1
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+""" Headless simulation of the 6.00 Word Game
+
+Deals a large number of hands with dealHand, lets the computer play each of
+them without any output and aggregates the results: the distribution of
+hand scores, how often the computer earned the bonus for using all the
+letters, and the mix of word lengths it played.
+
+The hands are split into chunks that are played by a pool of worker
+processes. Every chunk draws from its own random.Random, seeded from the
+run's seed and the chunk number, so a run gives the same results whatever
+the number of workers or the order in which the chunks finish.
+
+Example:
+    python simulate.py --hands 100000 --hand-size 7 --workers 4 --seed 1
+"""
+
+import argparse
+from collections import Counter
+import json
+import multiprocessing
+import random
+import time
+
+import wordgame
+from sharedlex import SharedLexicon
+
+# The SharedLexicon a worker attached to, kept alive for the worker's lifetime
+sharedLexicon = None
+
+
+def _initWorker(handSize, sharedName=None):
+    """
+    Loads the word list in a worker process, without any output, or attaches
+    to the shared lexicon published under sharedName.
+    """
+    global sharedLexicon
+    if sharedName is not None:
+        sharedLexicon = SharedLexicon.attach(sharedName)
+        sharedLexicon.install(handSize)
+        return
+    wordgame.loadWorkerWords(handSize)
+
+
+def chunkRng(seed, chunk):
+    """
+    Returns the random.Random used for the given chunk of a run.
+    """
+    return random.Random('%s:%d' % (seed, chunk))
+
+
+def playChunk(spec):
+    """
+    Deals and plays the hands of one chunk and returns their statistics.
+
+    spec: tuple (chunk, hands, handSize, strategy, seed)
+    returns: dict with the Counters 'scores' (hand score -> hands) and
+    'wordLengths' (word length -> words) and the ints 'hands' and 'bonus'
+    """
+    chunk, hands, handSize, strategy, seed = spec
+    wordList = wordgame.wordList
+    rng = chunkRng(seed, chunk)
+    scores = Counter()
+    wordLengths = Counter()
+    bonus = 0
+    for hand in wordgame.dealHands(hands, handSize, wordList, rng):
+        total = 0
+        left = hand
+        for word, score, left in wordgame.compPlayTurns(hand, wordList, strategy, rng):
+            total += score
+            wordLengths[len(word)] += 1
+        # The bonus is earned exactly when the last word uses up the hand
+        if wordgame.calculateHandlen(left) == 0:
+            bonus += 1
+        scores[total] += 1
+    return {'hands': hands, 'bonus': bonus, 'scores': scores, 'wordLengths': wordLengths}
+
+
+def simulate(hands, handSize, workers=None, strategy='greedy', seed=0, chunkSize=500, shared=False):
+    """
+    Plays the given number of hands and returns the aggregated statistics.
+
+    hands: int, number of hands to deal
+    handSize: int, letters per hand
+    workers: int, number of worker processes (default: one per CPU); 0
+    plays every hand in this process
+    strategy: string (one of wordgame.STRATEGIES), see compPlayHand
+    seed: int or string, seed of the run
+    chunkSize: int, number of hands per chunk
+    shared: bool, load the word list once and share it with the workers
+    through a SharedLexicon instead of loading it in every worker
+    returns: dict, see playChunk, plus 'seconds' and 'handsPerSecond'
+    """
+    specs = []
+    for chunk, start in enumerate(range(0, hands, chunkSize)):
+        specs.append((chunk, min(chunkSize, hands - start), handSize, strategy, seed))
+
+    result = {'hands': 0, 'bonus': 0, 'scores': Counter(), 'wordLengths': Counter()}
+
+    def merge(part):
+        result['hands'] += part['hands']
+        result['bonus'] += part['bonus']
+        result['scores'].update(part['scores'])
+        result['wordLengths'].update(part['wordLengths'])
+
+    start = time.perf_counter()
+    if workers == 0:
+        _initWorker(handSize)
+        for spec in specs:
+            merge(playChunk(spec))
+    elif shared:
+        wordList = wordgame.loadWords(handSize, verbose=False)
+        with SharedLexicon.create(wordList) as lexicon:
+            with multiprocessing.Pool(workers, initializer=_initWorker,
+                                      initargs=(handSize, lexicon.name)) as pool:
+                for part in pool.imap_unordered(playChunk, specs):
+                    merge(part)
+    else:
+        with multiprocessing.Pool(workers, initializer=_initWorker, initargs=(handSize,)) as pool:
+            for part in pool.imap_unordered(playChunk, specs):
+                merge(part)
+    result['seconds'] = time.perf_counter() - start
+    result['handsPerSecond'] = result['hands'] / result['seconds'] if result['seconds'] else 0.0
+    return result
+
+
+def histogram(scores, width=10):
+    """
+    Groups a Counter of hand scores into buckets of the given width.
+
+    returns: list of (bucket start, hands), in increasing score order
+    """
+    buckets = Counter()
+    for score, count in scores.items():
+        buckets[score - score % width] += count
+    return sorted(buckets.items())
+
+
+def report(result, width=10):
+    """ Returns a printable summary of the result of simulate """
+    hands = result['hands']
+    lines = []
+    lines.append("Hands played: {:,} in {:.2f}s ({:,.0f} hands/s)".format(
+        hands, result['seconds'], result['handsPerSecond']))
+    if hands:
+        mean = sum(s * c for s, c in result['scores'].items()) / hands
+        lines.append("Mean score: {:.1f}".format(mean))
+        lines.append("Bonus rate: {:.1%}".format(result['bonus'] / hands))
+    lines.append("Score histogram:")
+    for start, count in histogram(result['scores'], width):
+        lines.append("  {:>4}-{:<4} {:>8,} {:6.1%}".format(start, start + width - 1, count, count / hands))
+    words = sum(result['wordLengths'].values())
+    lines.append("Word lengths:")
+    for length, count in sorted(result['wordLengths'].items()):
+        lines.append("  {:>2} {:>8,} {:6.1%}".format(length, count, count / words))
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless simulation of the 6.00 Word Game")
+    parser.add_argument('--hands', type=int, default=10000, help="number of hands to play")
+    parser.add_argument('--hand-size', type=int, default=wordgame.HAND_SIZE, help="letters per hand")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="worker processes (default: one per CPU, 0: no pool)")
+    parser.add_argument('--strategy', choices=wordgame.STRATEGIES, default='greedy')
+    parser.add_argument('--seed', default='0', help="seed of the run, for reproducible results")
+    parser.add_argument('--chunk-size', type=int, default=500, help="hands per chunk")
+    parser.add_argument('--shared', action='store_true',
+                        help="share one copy of the word list with the workers (see sharedlex.py)")
+    parser.add_argument('--json', metavar='PATH', help="also write the results as JSON to PATH")
+    args = parser.parse_args(argv)
+
+    result = simulate(args.hands, args.hand_size, args.workers, args.strategy,
+                      args.seed, args.chunk_size, args.shared)
+    print(report(result))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(dict(result, scores=sorted(result['scores'].items()),
+                           wordLengths=sorted(result['wordLengths'].items())), f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
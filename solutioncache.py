@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+""" On-disk cache of solved starting hands for the 6.00 Word Game
+
+dealHand always deals the letters of a word of the word list, so the
+starting hands of a game are known in advance: one per distinct signature
+(sorted letters) among the words of each length. precompute.py solves
+every one of them offline and stores the results in a SQLite database,
+keyed by signature:
+
+    solutions(sig, candidates, total, score, words)
+
+candidates is the ranked list of (score, word) pairs of compCandidates
+for a hand of len(sig) letters, cut to the best CANDIDATES_KEPT (total is
+the full count), score and words the best sequence of compSolveHand, both
+as JSON. The computer player only ever asks for the best few candidates;
+asking for more than were kept counts as a miss. A meta table records the
+word list file the results were computed from (its SHA-256 hash), so a
+cache built for another word list is never used.
+
+The results only depend on the letters of the hand, so any hand whose
+signature is stored (a dealt hand, or what is left of one that happens to
+be a word) is answered from the cache. SolutionCache counts the hits and
+misses of its lookups.
+"""
+
+import json
+import sqlite3
+import threading
+
+from lexcache import fileHash
+
+# Ranked candidates stored per hand
+CANDIDATES_KEPT = 16
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS solutions (
+    sig TEXT PRIMARY KEY,
+    candidates TEXT NOT NULL,
+    total INTEGER NOT NULL,
+    score INTEGER NOT NULL,
+    words TEXT NOT NULL
+) WITHOUT ROWID;
+"""
+
+
+class SolutionCacheError(Exception):
+    """ Raised when a solution cache does not belong to the word list """
+
+
+def sourceStamp(source):
+    """ Returns the stamp (hex SHA-256) of the word list file source """
+    return fileHash(source).hex()
+
+
+class SolutionCache(object):
+    """ SQLite store of the solutions of hands, keyed by signature """
+
+    def __init__(self, path, source=None, create=False):
+        """
+        path: string, the database file
+        source: string, the word list file the solutions belong to; the
+        cache must have been built from it (checked when given)
+        create: bool, create the database (recording source) if it does not
+        exist yet, for precompute.py
+
+        raises SolutionCacheError if the cache was built from another word
+        list, or does not exist and create is False
+        """
+        if not create:
+            # Do not create an empty database by mistake
+            try:
+                open(path, 'rb').close()
+            except OSError as e:
+                raise SolutionCacheError("no solution cache at " + path + ": " + str(e))
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        with self._lock, self.conn:
+            self.conn.executescript(SCHEMA)
+        if source is not None:
+            stamp = sourceStamp(source)
+            stored = self.meta('source')
+            if stored is None and create:
+                self.setMeta('source', stamp)
+            elif stored != stamp:
+                self.conn.close()
+                raise SolutionCacheError(path + " was not built from " + source)
+
+    def meta(self, key):
+        with self._lock:
+            row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def setMeta(self, key, value):
+        with self._lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (key, value))
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def candidates(self, sig, k=None):
+        """
+        Returns the ranked (score, word) pairs for a hand of len(sig)
+        letters with the signature sig (the best k of them), or None if
+        sig is not stored or more candidates were asked for than kept.
+        """
+        with self._lock:
+            row = self.conn.execute("SELECT candidates, total FROM solutions WHERE sig = ?",
+                                    (sig,)).fetchone()
+        if row is not None:
+            ranked = tuple(tuple(sw) for sw in json.loads(row[0]))
+            if len(ranked) < row[1] and (k is None or k > len(ranked)):
+                row = None
+        self._count(row is not None)
+        if row is None:
+            return None
+        return ranked if k is None else ranked[:k]
+
+    def solution(self, sig):
+        """
+        Returns (score, words) of the best sequence of words for the hand
+        with the signature sig, or None if sig is not stored.
+        """
+        with self._lock:
+            row = self.conn.execute("SELECT score, words FROM solutions WHERE sig = ?", (sig,)).fetchone()
+        self._count(row is not None)
+        if row is None:
+            return None
+        return row[0], json.loads(row[1])
+
+    def put(self, results):
+        """
+        Stores results in one transaction.
+
+        results: iterable of (sig, candidates, score, words), candidates
+        being the full ranked list
+        """
+        rows = [ (sig, json.dumps(candidates[:CANDIDATES_KEPT], separators=(',', ':')), len(candidates),
+                  score, json.dumps(words, separators=(',', ':')))
+                 for sig, candidates, score, words in results ]
+        with self._lock, self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO solutions VALUES (?, ?, ?, ?, ?)", rows)
+
+    def compact(self):
+        """ Rebuilds the database file without the space left by the inserts """
+        with self._lock:
+            self.conn.execute("VACUUM")
+
+    def signatures(self):
+        """ Returns the set of the signatures stored """
+        with self._lock:
+            return set(row[0] for row in self.conn.execute("SELECT sig FROM solutions"))
+
+    def __len__(self):
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM solutions").fetchone()[0]
+
+    def stats(self):
+        """ Returns a dict with the size and the counters of the cache """
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hitRate': self.hits / lookups if lookups else 0.0,
+        }
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+""" Optimal whole-hand solver for the 6.00 Word Game
+
+The computer player in wordgame.compPlayHand is greedy: it picks one of
+the best single words each turn. The solver instead finds the sequence of
+words that maximizes the total score of the hand, including the 50 point
+bonus getWordScore gives for a word that uses every letter left in the
+hand.
+
+The search runs over the multisets of letters left in the hand. A state
+is identified by its signature (the sorted remaining letters), so the
+best result for a state is computed once and reused however it was
+reached. The moves from a state are found by looking up its sub-multisets
+in the anagram index, and since anagrams always score the same, only one
+word per signature has to be tried.
+"""
+
+from collections import namedtuple
+
+from anagram import BONUS, handSignature, splitSignatures
+
+Solution = namedtuple('Solution', ['score', 'words', 'nodes', 'cacheHits'])
+Solution.__doc__ = """ Result of solveHand
+
+score: int, total score of the best sequence of words
+words: list of strings, the words to play in order
+nodes: int, number of hand states expanded by the search
+cacheHits: int, number of times a hand state was found in the memo
+"""
+
+
+def solveHand(hand, wordList, index):
+    """
+    Returns the Solution with the highest total score for the hand.
+
+    hand: dictionary (string -> int)
+    wordList: dict (string -> list), list[0] is the word score
+    index: dictionary (string -> list of strings), the anagram index of
+    wordList (see anagram.buildAnagramIndex)
+    returns: Solution
+    """
+    # memo: signature of remaining letters -> (best score, (word, rest) or None)
+    memo = {}
+    stats = [0, 0]
+
+    def best(sig):
+        if sig in memo:
+            stats[1] += 1
+            return memo[sig][0]
+        stats[0] += 1
+        counts = {}
+        for ltr in sig:
+            counts[ltr] = counts.get(ltr, 0) + 1
+
+        bestScore, bestPlay = 0, None
+        for sub, rest in splitSignatures(counts):
+            words = index.get(sub)
+            if not words:
+                continue
+            score = wordList[words[0]][0]
+            if len(sub) == len(sig):
+                score += BONUS
+            total = score + best(rest)
+            if total > bestScore:
+                bestScore, bestPlay = total, (words[0], rest)
+        memo[sig] = (bestScore, bestPlay)
+        return bestScore
+
+    start = handSignature(hand)
+    total = best(start)
+
+    # Follow the best plays from the starting hand
+    words = []
+    play = memo[start][1]
+    while play is not None:
+        words.append(play[0])
+        play = memo[play[1]][1]
+    return Solution(total, words, stats[0], stats[1])
@@ -1,16 +1,38 @@
 # The 6.00 Word Game
 
 import random
-from randomdict import RandomDict
+import heapq
 import threading
-import queue
+from randomdict import RandomDict
+from anagram import BONUS, buildAnagramIndex, findWords, handSignature, rankKey
+from lettermatrix import HAVE_NUMPY, LetterMatrix
+from dawg import Dawg, DawgAnagramIndex, footprintReport
+from columnar import ColumnarLexicon
+from livelex import LiveLexicon
+from lazyscore import LazyLexicon
+from scanpool import ScanPool
+import hints
+from lexcache import openSnapshot, writeSnapshot
+from ingest import Progress, chunks, ingest, readWords, totalSize
+from solver import Solution, solveHand
+from solutioncache import SolutionCache, SolutionCacheError
+from anytime import chooseWord as chooseAnytime
+from handcache import HandCache
+from hand import Hand
+import argparse
+import contextlib
+import metrics
+import time
 import textwrap
+import sys
+import io
 
 
 
 VOWELS = 'aeiou'
 CONSONANTS = 'bcdfghjklmnpqrstvwxyz'
 HAND_SIZE = 7
+MAX_HAND_SIZE = 8
 
 SCRABBLE_LETTER_VALUES = {
     'a': 1, 'b': 3, 'c': 3, 'd': 2, 'e': 1, 'f': 4, 'g': 2, 'h': 4, 'i': 1, 'j': 8, 'k': 5, 'l': 1, 'm': 3, 'n': 1, 'o': 1, 'p': 3, 'q': 10, 'r': 1, 's': 1, 't': 1, 'u': 1, 'v': 4, 'w': 4, 'x': 8, 'y': 4, 'z': 10
@@ -22,52 +44,510 @@ SCRABBLE_LETTER_VALUES = {
 
 WORDLIST_FILENAME = "words.txt"
 
-def loadWords_thread(in_queue):
-    """ Worker queue processing function
-    """
-    while True:
-        item = in_queue.get()
-        # wordList is a dict. str -> list
-        # keys are words, list[0] is the score list[1] is the word len
-        wordList[item] = [ getWordScore_init(item), len(item) ]
-        in_queue.task_done()
-        
-def loadWords(n):
+# Move generation engine used by compChooseWord:
+#   'index' looks up the sub-multisets of the hand in the anagram index
+#   'numpy' compares the hand against a letter-count matrix of the word list
+#           (falls back to 'index' when numpy is not installed)
+#   'scan'  checks every word in the word list with isValidWord
+#   'pool'  scans the word list in contiguous chunks on a persistent pool
+#           of worker processes (see scanpool.py)
+COMP_ENGINE = 'index'
+
+# Worker processes of the 'pool' engine (None: one per CPU)
+COMP_POOL_WORKERS = None
+
+# Ranked candidates of recently seen hands, see compCandidates. Cleared
+# whenever the word list is (re)loaded.
+COMP_CACHE_SIZE = 4096
+candidateCache = HandCache(COMP_CACHE_SIZE)
+candidateCacheSource = None
+
+# Strategy used by compPlayHand:
+#   'greedy'  chooses one of the best single words each turn (compChooseWord)
+#   'optimal' plays the sequence of words with the highest total score
+#             for the whole hand (compSolveHand)
+#   'anytime' plays the best single word it can find (and prove) within
+#             COMP_DEADLINE_MS each turn (compChooseWordAnytime)
+#   'lookahead' as 'anytime', but spends the time left on the best first
+#             word of a whole-hand sequence
+STRATEGIES = ('greedy', 'optimal', 'anytime', 'lookahead')
+COMP_STRATEGY = 'greedy'
+
+# Time budget (milliseconds) of each turn of the 'anytime' and 'lookahead'
+# strategies
+COMP_DEADLINE_MS = 50
+
+# How compChooseWord picks among the best words of a hand: the weights of
+# choosing the best, second best, ... word. The number of weights is the
+# number of top words considered (k).
+DIFFICULTIES = {
+    'easy':   (1, 1, 2, 2, 2, 2),
+    'normal': (1, 3, 4, 2),
+    'hard':   (1,),
+}
+COMP_DIFFICULTY = DIFFICULTIES['normal']
+
+# Precomputed solutions of starting hands (see solutioncache.py), used by
+# compCandidates and compSolveHand when set with useSolutionCache
+solutionCache = None
+
+# Anagram index for the most recently loaded/indexed word list
+anagramIndex = None
+anagramIndexSource = None
+
+# Words of the most recently loaded word list grouped by length, for dealHand
+lengthBuckets = None
+lengthBucketsSource = None
+
+# Letter-count matrix for the most recently used word list ('numpy' engine)
+letterMatrix = None
+letterMatrixSource = None
+
+# Scan pool of the most recently used word list ('pool' engine)
+scanPool = None
+scanPoolSource = None
+
+# Dawg of the most recently used word list, for hints
+dawg = None
+dawgSource = None
+
+# Hints shown for '?prefix' in playHand: how many words, and how long
+# (seconds) the search for them may take
+HINT_COUNT = 5
+HINT_BUDGET = 0.001
+# Prefixes of at most this many letters are answered from the anagram index
+# (every word of the hand, ranked) rather than by the Dawg search: that is
+# exact and takes a few milliseconds, where the search below a short prefix
+# often runs out of its budget before finding the best words
+HINT_INDEX_PREFIX = 1
+
+def loadWords(n, compact=False, useCache=True, rebuildCache=False, sources=None, progress=True,
+              columnar=False, verbose=True, live=False, lazy=False):
     """
     Returns a list of valid words based on maximum word size n. 
     Words are strings of lowercase letters. n assumed to be integer
     
     n: int representing maximum word size
+    compact: if True, the words are stored in a compact Dawg (see dawg.py)
+    instead of a dict, and the memory footprint of both is reported
+    columnar: if True, the words are stored in a ColumnarLexicon (see
+    columnar.py) instead of a dict, for scan-heavy workloads
+    live: if True, the words are stored in a LiveLexicon (see livelex.py),
+    whose words can be added, removed and reloaded while in use
+    useCache: if True, the words are read from the precompiled snapshot of
+    WORDLIST_FILENAME (see lexcache.py), which is written on first load
+    rebuildCache: if True, the snapshot is rebuilt from the word list file
+    sources: list of word list files (plain, gzip or bz2) to merge, without
+    duplicates (default: [WORDLIST_FILENAME]); only a single file gets a
+    snapshot
+    progress: if True, the progress of reading the files is shown on stderr
+    verbose: if False, nothing is printed
+    lazy: if True, the words are stored in a LazyLexicon (see
+    lazyscore.py) and each one is scored when its score is first needed,
+    unless a snapshot (already scored) is available; no snapshot is written
     Depending on the size of the word list, this function may
-    take a while to finish.
+    take a while to finish (unless a snapshot is available).
     
     """
-    print("Loading word list from file...")
+    say = print if verbose else (lambda *args, **kwargs: None)
+    say("Loading word list from file...")
+    loadStart = time.perf_counter()
+
+    if sources is None:
+        sources = [WORDLIST_FILENAME]
+    useCache = useCache and len(sources) == 1
+
+    snapshot = None
+    snapshotIndex = None
+    if useCache and not rebuildCache:
+        snapshot = openSnapshot(sources[0])
+
+    if snapshot is not None:
+        # The snapshot already holds the scores and the anagram signatures
+        words = snapshot.wordList(n)
+        snapshotIndex = snapshot.anagramIndex(n)
+        snapshot.close()
+    elif lazy:
+        # Only read and number the words, scoring comes later
+        reader = Progress(totalSize(sources), sys.stderr if progress and verbose else io.StringIO())
+
+        def readUpTo(n):
+            for chunk in chunks(readWords(sources, reader)):
+                reader.update(len(chunk))
+                yield from (word for word in chunk if len(word) <= n)
+
+        words = LazyLexicon(readUpTo(n), SCRABBLE_LETTER_VALUES)
+        say("  ", reader.finish())
+    else:
+        # A snapshot has to serve any hand size, so score every word for it
+        maxLen = None if useCache else n
+        reader = Progress(totalSize(sources), sys.stderr if progress and verbose else io.StringIO())
+        words = ingest(sources, getWordScore_init, maxLen, progress=reader)
+        say("  ", reader.finish())
+
+        if useCache:
+            try:
+                writeSnapshot(sources[0], list(words), [ v[0] for v in words.values() ])
+            except OSError as e:
+                say("   Could not write lexicon snapshot:", e)
+            words = { x: y for x, y in words.items() if y[1] <= n }
+
+    result = useWordList(words, compact, columnar, index=snapshotIndex, verbose=verbose,
+                         live=live, maxLen=n)
+    metrics.observe('load', time.perf_counter() - loadStart)
+    say("  ", len(result), "words loaded.")
+    return result
+
+def loadWorkerWords(n=MAX_HAND_SIZE):
+    """
+    Loads the word list (of words of at most n letters) in a worker process
+    of a pool, without any output. Used as the pool initializer by batch.py,
+    precompute.py, simulate.py and server.py.
+    """
+    return loadWords(n, verbose=False)
+
+def useWordList(words, compact=False, columnar=False, index=None, buckets=None, verbose=True,
+                live=False, maxLen=None):
+    """
+    Makes words the loaded word list: stores it as requested, drops the
+    cached move generation results and builds (or installs) the length
+    buckets used by dealHand and the anagram index used for move
+    generation. This is the last step of loadWords.
+
+    words: dict (string -> list) or LazyLexicon
+    compact, columnar, live: see loadWords
+    index: anagram index of words, built when omitted
+    buckets: length buckets of words, built when omitted
+    maxLen: int, longest word a LiveLexicon accepts later on
+    returns: the word list, as a dict, Dawg, ColumnarLexicon or LiveLexicon
+    """
     global wordList
-    wordList = {}
-    work = queue.Queue()
-    
-    # Create 4 threads to process the words from the file into a dict
-    for i in range(4):
-        t = threading.Thread(target=loadWords_thread, args=(work,))
-        t.daemon = True
-        t.start()
-
-    # Use with open for guaranteed file closing
-    with open(WORDLIST_FILENAME, 'r') as inFile:  
-        for line in inFile:
-            # First, check if the word has less or equal # of letters as n
-            if len(line.strip().lower()) <= n:
-                #If true, put the work in the worker queue
-                work.put(line.strip().lower())
-
-    # work.join() makes sure all processing is completed by threads before
-    # continuing with the program
-    work.join()
-
-    print("  ", len(wordList), "words loaded.")
+    global anagramIndex
+    global anagramIndexSource
+    global lengthBuckets
+    global lengthBucketsSource
+
+    if isinstance(words, LazyLexicon) and (compact or columnar or live):
+        # Every score is copied into the new word list: score them in bulk
+        words.scoreAll()
+
+    if compact:
+        # Replace the dict with the Dawg once it has been built from it; the
+        # deals and the move generation are served from the Dawg as well
+        wordList = Dawg.fromWordList(words)
+        buckets = wordList.lengthBuckets()
+        index = DawgAnagramIndex(wordList)
+        if verbose:
+            print(footprintReport(words, wordList, buckets))
+    elif columnar:
+        wordList = ColumnarLexicon.fromWordList(words)
+        buckets = None
+        if verbose:
+            print("   Columnar lexicon: {:,} bytes".format(wordList.nbytes()))
+    elif live:
+        # The lexicon keeps its own buckets and index up to date
+        wordList = LiveLexicon(words, getWordScore_init, maxLen)
+        wordList.listeners.append(wordListChanged)
+        index = wordList.index
+        buckets = wordList.buckets
+    else:
+        wordList = words
+
+    # Cached move generation results belong to the previous word list
+    candidateCache.clear()
+
+    # Build the length buckets used by dealHand and the anagram index used
+    # for move generation once, at load time; a LazyLexicon leaves the index
+    # to the first move generation, see getAnagramIndex
+    with metrics.timer('index_build'):
+        if buckets is not None:
+            lengthBuckets = buckets
+            lengthBucketsSource = wordList
+        else:
+            getLengthBuckets(wordList)
+        if index is not None:
+            anagramIndex = index
+            anagramIndexSource = wordList
+        elif not isinstance(wordList, LazyLexicon):
+            getAnagramIndex(wordList)
     return wordList
 
+def wordListChanged(lexicon):
+    """
+    Called by a LiveLexicon after words were added or removed: drops what
+    was built from the old words and cannot be updated in place (its
+    length buckets and anagram index are updated by the lexicon itself).
+    """
+    global dawgSource
+    global letterMatrixSource
+    candidateCache.clear()
+    if solutionCache is not None:
+        # Precomputed for the old words
+        print("Word list changed: no longer using the solution cache")
+        useSolutionCache(None)
+    if scanPoolSource is lexicon:
+        closeScanPool()
+    if dawgSource is lexicon:
+        dawgSource = None
+    if letterMatrixSource is lexicon:
+        letterMatrixSource = None
+
+def useSolutionCache(path, source=None):
+    """
+    Makes compCandidates and compSolveHand look up the hands they are asked
+    about in the solution cache at path (built by precompute.py from the
+    word list file source, WORDLIST_FILENAME by default) before computing
+    them. A path of None stops using the cache.
+
+    returns: SolutionCache, or None if there is no usable cache at path
+    """
+    global solutionCache
+    if solutionCache is not None:
+        solutionCache.close()
+        solutionCache = None
+    if path is None:
+        return None
+    try:
+        solutionCache = SolutionCache(path, source or WORDLIST_FILENAME)
+    except SolutionCacheError as e:
+        print("   Not using the solution cache:", e)
+    return solutionCache
+
+def reading(wordList):
+    """
+    Returns a context manager during which wordList does not change: the
+    read lock of a LiveLexicon, nothing for other word lists.
+    """
+    if isinstance(wordList, LiveLexicon):
+        return wordList.reading()
+    return contextlib.nullcontext()
+
+class BackgroundLoader(object):
+    """
+    Loads the word list for every hand size in a background thread, so that
+    it can be read while the player goes through the welcome screen.
+
+    Usage:
+        loader = BackgroundLoader(useCache=True)
+        loader.start()
+        n = welcome()
+        wordList = loader.result(n)     # waits only for unfinished work
+    """
+
+    def __init__(self, **options):
+        """
+        options: keyword arguments of loadWords (useCache, rebuildCache,
+        sources, lazy), used for the load
+        """
+        self.options = options
+        self.words = None
+        self.index = None
+        self.buckets = None
+        self.error = None
+        self.loadSeconds = None
+        self.waitSeconds = None
+        self.thread = threading.Thread(target=self._load, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def _load(self):
+        start = time.perf_counter()
+        try:
+            self.words = loadWords(MAX_HAND_SIZE, verbose=False, **self.options)
+            if anagramIndexSource is self.words:
+                # Not built for a LazyLexicon
+                self.index = anagramIndex
+            self.buckets = lengthBuckets
+        except BaseException as e:
+            self.error = e
+        finally:
+            self.loadSeconds = time.perf_counter() - start
+
+    def done(self):
+        """ Returns True once the load has finished """
+        return not self.thread.is_alive()
+
+    def result(self, n, compact=False, columnar=False):
+        """
+        Waits for the load to finish and returns the word list for hands of
+        n letters (see loadWords for compact and columnar). The load time
+        and the time spent waiting for it are reported separately.
+        """
+        waitStart = time.perf_counter()
+        if not self.done():
+            print("Loading word list from file...")
+        self.thread.join()
+        self.waitSeconds = time.perf_counter() - waitStart
+        metrics.observe('load_wait', self.waitSeconds)
+        if self.error is not None:
+            raise self.error
+
+        # Every word of the full list has at most MAX_HAND_SIZE letters,
+        # and a signature is as long as its words
+        if isinstance(self.words, LazyLexicon):
+            # Nothing is scored yet: number the shorter words afresh
+            words = LazyLexicon((x for x in self.words if len(x) <= n), SCRABBLE_LETTER_VALUES)
+        else:
+            words = { x: y for x, y in self.words.items() if y[1] <= n }
+        index = None
+        if self.index is not None:
+            index = { sig: match for sig, match in self.index.items() if len(sig) <= n }
+        buckets = { length: bucket for length, bucket in self.buckets.items() if length <= n }
+        result = useWordList(words, compact, columnar, index, buckets)
+        print("  ", len(result), "words loaded ({:.2f}s in the background, {:.2f}s waiting).".format(
+            self.loadSeconds, self.waitSeconds))
+        return result
+
+def getAnagramIndex(wordList):
+    """
+    Returns the anagram index (signature -> list of words) for wordList.
+
+    The index is built the first time it is requested for a given word
+    list and reused afterwards.
+
+    wordList: dict (string -> list)
+    returns: dictionary (string -> list of strings)
+    """
+    global anagramIndex
+    global anagramIndexSource
+    if anagramIndexSource is not wordList and isinstance(wordList, Dawg):
+        # The words of a signature are looked up in the graph
+        anagramIndex = DawgAnagramIndex(wordList)
+        anagramIndexSource = wordList
+    elif anagramIndexSource is not wordList:
+        anagramIndex = buildAnagramIndex(wordList)
+        anagramIndexSource = wordList
+    return anagramIndex
+
+def getLengthBuckets(wordList):
+    """
+    Returns the words of wordList grouped by length, as a dict mapping each
+    word length to a RandomDict (word -> score) of the words of that length.
+
+    The buckets are built the first time they are requested for a given
+    word list and reused afterwards.
+
+    wordList: dict (string -> list)
+    returns: dictionary (int -> RandomDict)
+    """
+    global lengthBuckets
+    global lengthBucketsSource
+    if lengthBucketsSource is not wordList and isinstance(wordList, (ColumnarLexicon, Dawg)):
+        # The words are already grouped by length in the arrays
+        lengthBuckets = wordList.lengthBuckets()
+        lengthBucketsSource = wordList
+    elif lengthBucketsSource is not wordList and isinstance(wordList, LazyLexicon):
+        # Group the words without scoring them
+        lengthBuckets = wordList.lengthBuckets()
+        lengthBucketsSource = wordList
+    elif lengthBucketsSource is not wordList:
+        words = {}
+        for x, y in wordList.items():
+            if y[1] not in words:
+                words[y[1]] = {}
+            words[y[1]][x] = y[0]
+        lengthBuckets = { length: RandomDict(match) for length, match in words.items() }
+        lengthBucketsSource = wordList
+    return lengthBuckets
+
+def getLetterMatrix(wordList):
+    """
+    Returns the LetterMatrix for wordList, building it the first time it is
+    requested for a given word list. Requires numpy.
+
+    wordList: dict (string -> list)
+    returns: LetterMatrix
+    """
+    global letterMatrix
+    global letterMatrixSource
+    if letterMatrixSource is not wordList:
+        if isinstance(wordList, LazyLexicon):
+            wordList.scoreAll()
+        letterMatrix = LetterMatrix(wordList)
+        letterMatrixSource = wordList
+    return letterMatrix
+
+def getScanPool(wordList):
+    """
+    Returns the ScanPool scanning wordList, starting it (and stopping the
+    pool of the previous word list) the first time it is requested for a
+    given word list. The workers get a ColumnarLexicon copy of the words.
+
+    wordList: dict (string -> list)
+    returns: ScanPool
+    """
+    global scanPool
+    global scanPoolSource
+    if scanPoolSource is not wordList:
+        closeScanPool()
+        if isinstance(wordList, ColumnarLexicon):
+            lexicon = wordList
+        else:
+            lexicon = ColumnarLexicon.fromWordList(wordList)
+        scanPool = ScanPool(lexicon, COMP_POOL_WORKERS)
+        scanPoolSource = wordList
+    return scanPool
+
+def closeScanPool():
+    """ Stops the worker processes of the 'pool' engine, if they are running """
+    global scanPool
+    global scanPoolSource
+    if scanPool is not None:
+        scanPool.close()
+    scanPool = None
+    scanPoolSource = None
+
+def getDawg(wordList):
+    """
+    Returns the Dawg of wordList (wordList itself if it is one), building
+    it the first time it is requested for a given word list.
+
+    wordList: dict (string -> list)
+    returns: Dawg
+    """
+    global dawg
+    global dawgSource
+    if isinstance(wordList, Dawg):
+        return wordList
+    if dawgSource is not wordList:
+        if isinstance(wordList, LazyLexicon):
+            wordList.scoreAll()
+        dawg = Dawg.fromWordList(wordList)
+        dawgSource = wordList
+    return dawg
+
+def getHints(hand, wordList, prefix, n=None):
+    """
+    Returns the hint lines for the words starting with prefix that can be
+    made from the hand, best first: from the candidates of the hand for a
+    prefix of at most HINT_INDEX_PREFIX letters, otherwise from the Dawg
+    search of hints.completions.
+
+    hand: dictionary (string -> int)
+    wordList: dict (string -> list)
+    prefix: string
+    n: integer, hand size for the bonus (defaults to the letters in hand)
+    returns: list of strings
+    """
+    with metrics.timer('hint'):
+        if len(prefix) <= HINT_INDEX_PREFIX:
+            if n is None:
+                n = calculateHandlen(hand)
+            ranked = [ sw for sw in compCandidates(hand, wordList, n, engine='index')
+                       if sw[1].startswith(prefix) ]
+            found = hints.Hints(ranked[:HINT_COUNT], True, len(ranked))
+        else:
+            with reading(wordList):
+                found = hints.completions(getDawg(wordList), hand, prefix, HINT_COUNT, HINT_BUDGET, n)
+    if not found.words:
+        return ["No word starting with '" + prefix + "' can be made from your letters."]
+    lines = [ "   " + word + " (" + str(score) + " points)" for score, word in found.words ]
+    if not found.complete:
+        lines.append("   ...and maybe more")
+    return lines
+
 def getFrequencyDict(sequence):
     """
     Returns a dictionary where the keys are elements of the sequence
@@ -127,7 +607,7 @@ def getWordScore(word, n):
     """
     score = wordList[word][0]
     if len(word) == n:
-        score += 50
+        score += BONUS
     return score
     
         
@@ -171,45 +651,73 @@ def shuffleHand(hand):
     """
     Displays hand in randomized order
     
-    hand: dictionary (string -> int)
+    hand: dictionary (string -> int) or Hand
     """
-    randHand = [ [e]*hand[e] for e in hand ]
-    randHand = flatten(randHand)
-    random.shuffle(randHand)
-    for ltr in randHand:
-        print(ltr, end=" ")
+    if not isinstance(hand, Hand):
+        hand = Hand.fromDict(hand)
+    print(hand.shuffled(), end=" ")
     print()
     
 
 #
 # Problem #2: Make sure you understand how this function works and what it does!
 #
-def dealHand(wordList, n):
+def dealHand(wordList, n, rng=None):
     """
     Generates a 'hand' from letters of a word in the wordlist with
     letters = n
     
-    Takes wordList and filters it to only contain words of length n,
-    then randomly chooses one of these words using RandomDict
+    Randomly chooses one of the words of length n in constant time, using
+    the RandomDict length buckets built when the word list was loaded
 
     n: int >= 4
-    returns: dictionary (string -> int)
+    rng: random.Random instance to draw from (optional, for reproducible
+    hands); the random module is used when omitted
+    returns: Hand (usable as a dictionary string -> int)
     """
 #    hand={}
 #    numVowels = n // 3
 #    
-
-    # First create a dictionary of words that match the word length selected
-    # at the beginning of the game
-    wordMatch = { x:y[0] for x, y in wordList.items() if y[1] == n }
-    wordMatchRand = RandomDict(wordMatch)
-        
-    myRandHand = wordMatchRand.random_key()
-    hand = getFrequencyDict(myRandHand)
+    if metrics.ENABLED:
+        dealStart = time.perf_counter()
+
+    # Pick from the words that match the word length selected at the
+    # beginning of the game
+    with reading(wordList):
+        wordMatchRand = getLengthBuckets(wordList).get(n)
+        if wordMatchRand is None:
+            raise KeyError("No words of length " + str(n) + " in the word list")
+        myRandHand = wordMatchRand.random_key(rng)
+    hand = Hand(myRandHand)
     
-        
+    if metrics.ENABLED:
+        metrics.observe('deal', time.perf_counter() - dealStart)
     return hand
 
+def dealHands(k, n, wordList=None, rng=None):
+    """
+    Deals k hands of n letters, see dealHand. The words are drawn in one
+    batch from the length bucket (its sample method), as k calls to
+    dealHand would draw them.
+
+    k: int >= 0, number of hands
+    n: int >= 4
+    wordList: dict (string -> list), defaults to the loaded word list
+    rng: random.Random instance to draw from (optional, for reproducible
+    hands); the random module is used when omitted
+    returns: list of Hands
+    """
+    if wordList is None:
+        wordList = globals()['wordList']
+    if k == 0:
+        return []
+    with reading(wordList):
+        wordMatchRand = getLengthBuckets(wordList).get(n)
+        if wordMatchRand is None:
+            raise KeyError("No words of length " + str(n) + " in the word list")
+        words = wordMatchRand.sample(k, rng)
+    return [ Hand(word) for word in words ]
+
 #
 # Problem #2: Update a hand by removing letters
 #
@@ -226,12 +734,18 @@ def updateHand(hand, word):
     Has no side effects: does not modify hand.
 
     word: string
-    hand: dictionary (string -> int)    
-    returns: dictionary (string -> int)
+    hand: dictionary (string -> int) or Hand
+    returns: dictionary (string -> int), or a Hand if hand is one
     """
+    if isinstance(hand, Hand):
+        newHand = hand.copy()
+        newHand.apply(word)
+        return newHand
 
-    return { x: hand[x] - word.count(x) if x in word else hand[x]
-        for x in hand if (hand.get(x,0) - word.count(x)) > 0 }    
+    newHand = dict(hand)
+    for ltr in word:
+        newHand[ltr] = newHand.get(ltr, 0) - 1
+    return { x: cnt for x, cnt in newHand.items() if cnt > 0 }
  
 
 #
@@ -245,9 +759,11 @@ def isValidWord(word, hand, wordList):
     Does not mutate hand or wordList.
    
     word: string
-    hand: dictionary (string -> int)
+    hand: dictionary (string -> int) or Hand
     wordList: list of lowercase strings
     """
+    if isinstance(hand, Hand):
+        return word in wordList and hand.canApply(word)
     if word in wordList:
         valWord = True
     else:
@@ -269,9 +785,11 @@ def calculateHandlen(hand):
     """ 
     Returns the length (number of letters) in the current hand.
     
-    hand: dictionary (string-> int)
+    hand: dictionary (string-> int) or Hand
     returns: integer
     """
+    if isinstance(hand, Hand):
+        return hand.total
     return sum(hand.values())
 
 
@@ -309,29 +827,35 @@ def playHand(hand, wordList, n):
             print("Current hand: ", end=" ")
             displayHand(hand)
         # Ask user for input
-        userSelect = input("Enter word, a 'r' to shuffle the letters, or a '.' to indicate that you are finished: ")
+        userSelect = input("Enter word, a 'r' to shuffle the letters, a '?' and the start of a word for hints, or a '.' to indicate that you are finished: ")
         print()
         # If the input is a single period:
         if userSelect == ".":
             # End the game (break out of the loop)
             break
+        # Hints for the words starting with the letters after the '?'
+        elif userSelect.startswith("?"):
+            for line in getHints(hand, wordList, userSelect[1:], calculateHandlen(hand)):
+                print(line)
         # Otherwise (the input is not a single period):
         elif userSelect == "r":
             print("Current hand: ", end=" ")
             shuffleHand(hand)
         else:
-            # If the word is not valid:
-            if not isValidWord(userSelect, hand, wordList):    
-                # Reject invalid word (print a message followed by a blank line)
-                print("Invalid word, please try again.")
-            # Otherwise (the word is valid):
-            else:
-                # Tell the user how many points the word earned, and the updated total score, in one line followed by a blank line
-                score += getWordScore(userSelect,calculateHandlen(hand))
-                print("Congratulations, your word '" + userSelect + "' has earned you " + 
-                    str(getWordScore(userSelect,calculateHandlen(hand))) + " points. Your new score is: " + str(score) + ".")
-                # Update the hand 
-                hand = updateHand(hand, userSelect)
+            # A LiveLexicon must not change between validating and scoring the word
+            with reading(wordList):
+                # If the word is not valid:
+                if not isValidWord(userSelect, hand, wordList):    
+                    # Reject invalid word (print a message followed by a blank line)
+                    print("Invalid word, please try again.")
+                # Otherwise (the word is valid):
+                else:
+                    # Tell the user how many points the word earned, and the updated total score, in one line followed by a blank line
+                    score += getWordScore(userSelect,calculateHandlen(hand))
+                    print("Congratulations, your word '" + userSelect + "' has earned you " + 
+                        str(getWordScore(userSelect,calculateHandlen(hand))) + " points. Your new score is: " + str(score) + ".")
+                    # Update the hand 
+                    hand = updateHand(hand, userSelect)
 
     # Game is over (user entered a '.' or ran out of letters), so tell user the total score
     print("Game over. You scored " + str(score) + " points.")
@@ -344,104 +868,279 @@ def playHand(hand, wordList, n):
     
     
     
-def compChooseWord_thread(in_queue, hand, n):
-    global bestScore
-    global bestWord
-    global topScores
-    
-    def addToTopScores(score, word):
-        for i in range(1,len(topScores)):
-            if score > topScores[i][0]:
-                topScores[i] = (score, word)
-                break
-            
-    lock = threading.Lock()    
-    while True:
-        word = in_queue.get()
-        if isValidWord(word, hand, wordList):
-            # find out how much making that word is worth
-            score = getWordScore(word, n)
-            # If the score for that word is higher than your best score
-
-            if (score > topScores[len(topScores)][0]):
-                # lock to prevent best words/scores being updated 
-                # simultaneously (very small probability, I think it's needed
-                # since topScores is global)
-                lock.acquire()                
-                # pass the score and word to the addToTopScores function to be
-                # sorted into the list of topScores (if applicable)
-                addToTopScores(score, word)
-                # release the lock
-                lock.release()
-        in_queue.task_done()
-
-
-def compChooseWord(hand, wordList, n):
+def topCandidates(candidates, k=None):
+    """
+    Ranks (score, word) pairs best first, ties in alphabetical order.
+
+    candidates: iterable of (int, string)
+    k: int, keep only the best k, selected in a single pass with a heap
+    of k entries (default: keep and sort them all)
+    returns: tuple of (int, string)
+    """
+    if k is None:
+        return tuple(sorted(candidates, key=rankKey))
+    return tuple(heapq.nsmallest(k, candidates, key=rankKey))
+
+def compCandidates(hand, wordList, n, engine=None, k=None):
+    """
+    Returns the words that can be made from the hand as a tuple of
+    (score, word) pairs, best first (ties in alphabetical order), see
+    topCandidates.
+
+    With the 'index' engine (the default) only the words whose letters
+    form a sub-multiset of the hand are considered, by looking them up in
+    the anagram index. The 'numpy' engine checks all the words at once
+    against a letter-count matrix and falls back to 'index' when numpy is
+    not installed. The 'scan' engine checks every word in the wordList (over
+    the arrays, with a letter-mask pre-filter, for a ColumnarLexicon). The
+    'pool' engine runs that scan in chunks on a pool of worker processes
+    kept for the session (see getScanPool).
+
+    Results are cached by hand in candidateCache, so a hand state that has
+    been seen before is not searched again. No other state is shared
+    between calls, so several threads may call this at the same time. A
+    LiveLexicon is read-locked while its words are searched.
+
+    hand: dictionary (string -> int)
+    wordList: list (string)
+    n: integer (HAND_SIZE; i.e., hand size required for additional points)
+    engine: string ('index', 'numpy', 'scan' or 'pool'), defaults to COMP_ENGINE
+    k: int, return only the best k words (default: all of them)
+
+    returns: tuple of (int, string)
+    """
+    global candidateCacheSource
+
+    if engine is None:
+        engine = COMP_ENGINE
+    if engine == 'numpy' and not HAVE_NUMPY:
+        engine = 'index'
+
+    with reading(wordList):
+        if candidateCacheSource is not wordList:
+            candidateCache.clear()
+            candidateCacheSource = wordList
+        key = (hand.key() if isinstance(hand, Hand) else handSignature(hand), n, engine, k)
+        ranked = candidateCache.get(key)
+        if ranked is not None:
+            if metrics.ENABLED:
+                metrics.count('candidate_cache_hits')
+            return ranked
+
+        if solutionCache is not None and n == calculateHandlen(hand):
+            # Precomputed for a hand of n letters, whatever the engine
+            ranked = solutionCache.candidates(key[0], k)
+            if metrics.ENABLED:
+                metrics.count('solution_cache_hits' if ranked is not None else 'solution_cache_misses')
+            if ranked is not None:
+                candidateCache.put(key, ranked)
+                return ranked
+
+        moveStart = time.perf_counter()
+        if engine == 'numpy':
+            # The matrix returns the words already ranked, best first
+            matrix = getLetterMatrix(wordList)
+            ranked = matrix.topK(hand, n, len(matrix) if k is None else k)
+            if metrics.ENABLED:
+                metrics.count('words_examined', len(matrix))
+                metrics.count('candidates_accepted', len(ranked))
+        elif engine == 'index':
+            # Every word found in the index can be made from the hand, so
+            # only the score needs to be computed
+            words = list(findWords(hand, getAnagramIndex(wordList)))
+            with metrics.timer('scoring'):
+                ranked = [ (getWordScore(word, n), word) for word in words ]
+            if metrics.ENABLED:
+                metrics.count('words_examined', len(words))
+                metrics.count('candidates_accepted', len(words))
+        elif engine == 'pool':
+            # Chunks of the arrays are scanned by the worker processes and
+            # their best k words merged
+            ranked = getScanPool(wordList).candidates(hand, n, k)
+            if metrics.ENABLED:
+                metrics.count('words_examined', len(wordList))
+                metrics.count('candidates_accepted', len(ranked))
+        elif isinstance(wordList, ColumnarLexicon):
+            # Scan the arrays, pre-filtered by the letter masks
+            ranked = [ (getWordScore(word, n), word) for word in map(wordList.word, wordList.playable(hand, n)) ]
+            if metrics.ENABLED:
+                metrics.count('words_examined', len(wordList))
+                metrics.count('candidates_accepted', len(ranked))
+        else:
+            # Check every word in a single pass, keeping only the candidates
+            ranked = [ (getWordScore(word, n), word) for word in wordList if isValidWord(word, hand, wordList) ]
+            if metrics.ENABLED:
+                metrics.count('words_examined', len(wordList))
+                metrics.count('candidates_accepted', len(ranked))
+
+        ranked = topCandidates(ranked, k)
+        candidateCache.put(key, ranked)
+        metrics.observe('move_generation', time.perf_counter() - moveStart)
+        return ranked
+
+def compChooseWord(hand, wordList, n, engine=None, rng=None, k=None, difficulty=None):
     """
     Given a hand and a wordList, find the word that gives 
     the maximum value score, and return it.
 
-    This word should be calculated by considering all the words
-    in the wordList.
+    The best k candidate words are found with compCandidates (see there for
+    the available engines), then one of them is chosen at random with the
+    weights of the difficulty, favouring the better ones. When there are
+    fewer than k candidates, the weights of the missing ones are left out.
 
     If no words in the wordList can be made from the hand, return None.
 
+    Safe to call from several threads at the same time.
+
     hand: dictionary (string -> int)
     wordList: list (string)
     n: integer (HAND_SIZE; i.e., hand size required for additional points)
+    engine: string ('index', 'numpy', 'scan' or 'pool'), defaults to COMP_ENGINE
+    rng: random.Random instance to choose with (optional, for reproducible
+    play); the random module is used when omitted
+    k: int >= 1, number of best words to choose from (defaults to the
+    number of weights of the difficulty)
+    difficulty: sequence of weights of choosing the best, second best, ...
+    word, or the name of one of DIFFICULTIES; defaults to COMP_DIFFICULTY
 
     returns: string or None
     """
-    # Create a new variable to store the maximum score seen so far (initially 0)
-    global bestScore
-    bestScore = 0
-    # Create a new variable to store the best word seen so far (initially None)  
-    global bestWord
-    bestWord = None
-    
-    global topScores
-    topScores = {1:(0, None), 2:(0, None), 3:(0, None), 4:(0, None)}
-    
-    work = queue.Queue()
-    
-    # Create 4 threads for processing the data
-    for i in range(4):
-        t = threading.Thread(target=compChooseWord_thread, args=(work, hand, n))
-        t.daemon = True
-        t.start()
-        
-    # For each word in the wordList
-    for word in wordList:
-        work.put(word)
-    # call join() to make sure all the work has been processed
-    work.join()
-    # return the best word you found.
-    
-    defaultDiff = [1,2,2,2,3,3,3,3,4,4]
-    
-    # Initially set the return result to None        
-    result = None
-    # Loop the choice until a result is returned (in case top N choices didn't
-    # provide a usable word)
-    while result == None:
-        #if the top result is None, return None
-        if topScores[1][1] == None:
-            return None
-        # otherwise, set the result to a random choice of the topScores based
-        # on the defaultDiff distribution (work on math for this later)
-        else: 
-            result = topScores[random.choice(defaultDiff)][1]
-    return result
+    if difficulty is None:
+        difficulty = COMP_DIFFICULTY
+    elif isinstance(difficulty, str):
+        difficulty = DIFFICULTIES[difficulty]
+    if k is None:
+        k = len(difficulty)
+
+    top = compCandidates(hand, wordList, n, engine, k)
+    if not top:
+        return None
+    weights = list(difficulty[:len(top)])
+    weights += [0] * (len(top) - len(weights))
+    if not any(weights):
+        # none of the words left is weighted: play the best one
+        return top[0][1]
+    return (rng or random).choices(top, weights)[0][1]
+
+def compChooseWordAnytime(hand, wordList, n, deadlineMs=None, lookahead=False):
+    """
+    Finds the best word for the hand within a time budget, see
+    anytime.chooseWord: the sub-multisets of the hand are looked up in the
+    anagram index best first, so the best word is usually found (and
+    proven) long before every candidate has been seen. When time runs out
+    the best word found so far is returned, unproven; the search only
+    stops once it has found a word, or proven there is none.
+
+    hand: dictionary (string -> int)
+    wordList: dict (string -> list)
+    n: integer (HAND_SIZE; i.e., hand size required for additional points)
+    deadlineMs: number, milliseconds the search may take (defaults to
+    COMP_DEADLINE_MS)
+    lookahead: bool, spend the time left on the best first word of a
+    whole-hand sequence (as compSolveHand)
+
+    returns: anytime.Choice (word, score, total, proven, examined); word is
+    None if no word can be made from the hand
+    """
+    if deadlineMs is None:
+        deadlineMs = COMP_DEADLINE_MS
+    moveStart = time.perf_counter()
+    with reading(wordList):
+        choice = chooseAnytime(hand, getAnagramIndex(wordList), SCRABBLE_LETTER_VALUES, n,
+                               moveStart + deadlineMs / 1000.0, lookahead)
+    if metrics.ENABLED:
+        metrics.count('words_examined', choice.examined)
+        metrics.count('anytime_proven' if choice.proven else 'anytime_unproven')
+    metrics.observe('move_generation', time.perf_counter() - moveStart)
+    return choice
 
 #
 # Computer plays a hand
 #
-def compPlayHand(hand, wordList, n):
+def compSolveHand(hand, wordList):
+    """
+    Finds the sequence of words with the highest total score for the hand,
+    including the bonus for using all the letters, see solver.solveHand.
+    A hand found in the solution cache is not searched (nodes and cacheHits
+    are 0).
+
+    hand: dictionary (string -> int)
+    wordList: dict (string -> list)
+    returns: solver.Solution (score, words, nodes, cacheHits)
+    """
+    if solutionCache is not None:
+        found = solutionCache.solution(hand.key() if isinstance(hand, Hand) else handSignature(hand))
+        if metrics.ENABLED:
+            metrics.count('solution_cache_hits' if found is not None else 'solution_cache_misses')
+        if found is not None:
+            return Solution(found[0], found[1], 0, 0)
+    with reading(wordList):
+        return solveHand(hand, wordList, getAnagramIndex(wordList))
+
+def compPlayTurns(hand, wordList, strategy=None, rng=None, solution=None):
+    """
+    Plays the given hand for the computer without any output, one word at a
+    time. This is the headless core of compPlayHand.
+
+    Yields (word, score, hand) for every word played, where hand is the
+    hand left after playing the word. Stops when the hand is empty or no
+    word can be made from it.
+
+    With the 'greedy' strategy each word is chosen with compChooseWord. With
+    the 'optimal' strategy the words of compSolveHand's solution are played
+    in order. The 'anytime' and 'lookahead' strategies choose each word with
+    compChooseWordAnytime within COMP_DEADLINE_MS.
+
+    hand: dictionary (string -> int)
+    wordList: dict (string -> list)
+    strategy: string (one of STRATEGIES), defaults to COMP_STRATEGY
+    rng: random.Random instance used by compChooseWord (optional)
+    solution: solver.Solution of the hand to play with the 'optimal'
+    strategy (solved here if omitted)
+
+    raises ValueError if a chosen word cannot be played from the hand
+    """
+    if strategy is None:
+        strategy = COMP_STRATEGY
+    plan = None
+    if strategy == 'optimal':
+        plan = list((solution or compSolveHand(hand, wordList)).words)
+    # Per-turn time budget (anytime and lookahead strategies)
+    deadlineMs = COMP_DEADLINE_MS if strategy in ('anytime', 'lookahead') else None
+    lookahead = strategy == 'lookahead'
+    # As long as there are still letters left in the hand:
+    while (calculateHandlen(hand) > 0) :
+        # A LiveLexicon must not change between choosing, validating and
+        # scoring the word (the lock is not held while the caller runs)
+        with reading(wordList):
+            # computer's word
+            if plan is not None:
+                word = plan.pop(0) if plan else None
+            elif deadlineMs is not None:
+                word = compChooseWordAnytime(hand, wordList, calculateHandlen(hand), deadlineMs, lookahead).word
+            else:
+                word = compChooseWord(hand, wordList, calculateHandlen(hand), rng=rng)
+            if word == None:
+                break
+            with metrics.timer('validation'):
+                valid = isValidWord(word, hand, wordList)
+            if not valid:
+                raise ValueError("cannot play " + repr(word) + " from the hand")
+            with metrics.timer('scoring'):
+                score = getWordScore(word, calculateHandlen(hand))
+            hand = updateHand(hand, word)
+        yield word, score, hand
+
+def compPlayHand(hand, wordList, n, strategy=None):
     """
     Allows the computer to play the given hand, following the same procedure
     as playHand, except instead of the user choosing a word, the computer 
     chooses it.
 
+    The words are chosen with the given strategy, as in compPlayTurns; with
+    the 'optimal' strategy the solution of the whole hand is reported
+    before it is played.
+
     1) The hand is displayed.
     2) The computer chooses a word.
     3) After every valid word: the word and the score for that word is 
@@ -454,37 +1153,37 @@ def compPlayHand(hand, wordList, n):
     hand: dictionary (string -> int)
     wordList: list (string)
     n: integer (HAND_SIZE; i.e., hand size required for additional points)
+    strategy: string (one of STRATEGIES), defaults to COMP_STRATEGY
     """
+    if strategy is None:
+        strategy = COMP_STRATEGY
+    # Solved up front to report it (optimal strategy), then played by
+    # compPlayTurns
+    solution = None
+    if strategy == 'optimal':
+        solution = compSolveHand(hand, wordList)
+        print("Solved hand for " + str(solution.score) + " points (" + str(solution.nodes) +
+              " nodes expanded, " + str(solution.cacheHits) + " cache hits)")
+        print()
     # Keep track of the total score
     totalScore = 0
-    # As long as there are still letters left in the hand:
-    while (calculateHandlen(hand) > 0) :
-        # Display the hand
-        print("Current Hand: ", end=' ')
-        displayHand(hand)
-        print()
-        # computer's word
-        word = compChooseWord(hand, wordList, calculateHandlen(hand))
-        # If the input is a single period:
-        if word == None:
-            # End the game (break out of the loop)
-            break
-            
-        # Otherwise (the input is not a single period):
-        else :
-            # If the word is not valid:
-            if (not isValidWord(word, hand, wordList)) :
-                print('This is a terrible error! I need to check my own code!')
-                break
-            # Otherwise (the word is valid):
-            else :
-                # Tell the user how many points the word earned, and the updated total score 
-                score = getWordScore(word, calculateHandlen(hand))
-                totalScore += score
-                print('"' + word + '" earned ' + str(score) + ' points. Total: ' + str(totalScore) + ' points')              
-                # Update hand and show the updated hand to the user
-                hand = updateHand(hand, word)
+    # Display the hand
+    print("Current Hand: ", end=' ')
+    displayHand(hand)
+    print()
+    try:
+        for word, score, hand in compPlayTurns(hand, wordList, strategy, solution=solution):
+            # Tell the user how many points the word earned, and the updated total score 
+            totalScore += score
+            print('"' + word + '" earned ' + str(score) + ' points. Total: ' + str(totalScore) + ' points')              
+            print()
+            # Show the updated hand to the user
+            if calculateHandlen(hand) > 0:
+                print("Current Hand: ", end=' ')
+                displayHand(hand)
                 print()
+    except ValueError:
+        print('This is a terrible error! I need to check my own code!')
     # Game is over (user entered a '.' or ran out of letters), so tell user the total score
     if calculateHandlen(hand) > 0:
         print("I give up!")
@@ -605,7 +1304,71 @@ def welcome():
 #
 # Build data structures used for entire session and play game
 #
+def parseArgs(argv=None):
+    """
+    Parses the command line options of the game
+    """
+    parser = argparse.ArgumentParser(description="The 6.00 Word Game")
+    parser.add_argument('--rebuild-cache', action='store_true',
+                        help="rebuild the precompiled lexicon snapshot from " + WORDLIST_FILENAME)
+    parser.add_argument('--no-cache', action='store_true',
+                        help="do not read or write the precompiled lexicon snapshot")
+    parser.add_argument('--strategy', choices=STRATEGIES, default=COMP_STRATEGY,
+                        help="how the computer plays a hand (default: %(default)s)")
+    parser.add_argument('--deadline-ms', type=float, default=COMP_DEADLINE_MS,
+                        help="time budget of each turn of the anytime and lookahead strategies (default: %(default)s)")
+    parser.add_argument('--engine', choices=['index', 'numpy', 'scan', 'pool'], default=COMP_ENGINE,
+                        help="how the computer finds the words of a hand (default: %(default)s)")
+    parser.add_argument('--pool-workers', type=int, default=None,
+                        help="worker processes of the pool engine (default: one per CPU)")
+    parser.add_argument('--difficulty', choices=sorted(DIFFICULTIES), default='normal',
+                        help="how often the computer settles for a word below its best (default: %(default)s)")
+    parser.add_argument('--cache-size', type=int, default=COMP_CACHE_SIZE,
+                        help="number of hands whose candidate words are cached (default: %(default)s)")
+    parser.add_argument('--metrics-json', metavar='PATH',
+                        help="record hot-path metrics and write them to PATH as JSON on exit")
+    parser.add_argument('--metrics-prom', metavar='PATH',
+                        help="record hot-path metrics and write them to PATH in the Prometheus text format on exit")
+    parser.add_argument('--words', nargs='+', metavar='PATH',
+                        help="word list files to merge (plain, .gz or .bz2; default: " + WORDLIST_FILENAME + ")")
+    parser.add_argument('--compact', action='store_true',
+                        help="store the word list in a compact DAWG and report its memory footprint")
+    parser.add_argument('--columnar', action='store_true',
+                        help="store the word list in columnar arrays, for scan-heavy workloads")
+    parser.add_argument('--solutions', metavar='PATH',
+                        help="look up starting hands in the solution cache at PATH (see precompute.py)")
+    parser.add_argument('--lazy', action='store_true',
+                        help="score each word when it is first needed rather than at load time")
+    return parser.parse_args(argv)
+
 if __name__ == '__main__':
+    args = parseArgs()
+    COMP_STRATEGY = args.strategy
+    COMP_DEADLINE_MS = args.deadline_ms
+    COMP_ENGINE = args.engine
+    COMP_POOL_WORKERS = args.pool_workers
+    COMP_DIFFICULTY = DIFFICULTIES[args.difficulty]
+    candidateCache.capacity = args.cache_size
+    if args.metrics_json or args.metrics_prom:
+        metrics.enable()
+    # Load the word list while the player reads the welcome screen
+    loader = BackgroundLoader(useCache=not args.no_cache, rebuildCache=args.rebuild_cache,
+                              sources=args.words, lazy=args.lazy).start()
     HAND_SIZE = welcome()
-    wordList = loadWords(HAND_SIZE)
-    playGame(wordList, HAND_SIZE)
+    wordList = loader.result(HAND_SIZE, compact=args.compact, columnar=args.columnar)
+    if args.solutions:
+        if args.words and len(args.words) > 1:
+            print("   Not using the solution cache: it belongs to a single word list file")
+        else:
+            useSolutionCache(args.solutions, args.words[0] if args.words else None)
+    try:
+        playGame(wordList, HAND_SIZE)
+    finally:
+        if solutionCache is not None:
+            stats = solutionCache.stats()
+            print()
+            print("Solution cache: {hits} hits, {misses} misses ({hitRate:.0%} hit rate)".format(**stats))
+        if args.metrics_json:
+            metrics.exportJSON(args.metrics_json)
+        if args.metrics_prom:
+            metrics.exportPrometheus(args.metrics_prom)